@@ -1,9 +1,10 @@
 from fastapi import FastAPI
-from app.models.base import create_tables
 from app.services.agent import NewsAgentGraph
 from app.services.news_scraper import NewsScraper
+from app.services.warmup import warmup
 from app.routes.chat import chat_router, set_news_agent
-from app.routes.news import news_router, set_scraper
+from app.routes.news import news_router, set_scraper, set_sessions
+from app.routes.admin import admin_router
 
 # Create FastAPI app
 app = FastAPI(
@@ -12,17 +13,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Initialize services
+# Initialize services (cheap: models, LLM clients and the graph are built lazily)
 news_agent = NewsAgentGraph()
 scraper = NewsScraper()
 
 # Set service instances in routers
 set_news_agent(news_agent)
 set_scraper(scraper)
+set_sessions(news_agent.memory)
 
 # Include routers
 app.include_router(chat_router)
 app.include_router(news_router)
+app.include_router(admin_router)
 
 @app.get("/")
 def home():
@@ -31,8 +34,14 @@ def home():
         "message": "🤖 Smart News Chat Bot is ready! Use /news/scrape to get started.",
         "endpoints": {
             "chat": "/chat/",
+            "chat_stream": "/chat/stream/",
+            "chat_batch": "/chat/batch/",
             "scrape_news": "/news/scrape/",
             "health": "/news/health/",
+            "ready": "/news/ready/",
+            "metrics": "/news/metrics/",
+            "reports": "/news/reports/{filename}?session_id=...",
+            "profiles": "/admin/profiles/",
             "docs": "/docs"
         }
     }
@@ -42,16 +51,9 @@ async def startup_event():
     """Startup event handler"""
     print("🚀 Starting Smart News Chat Bot...")
     
-    # Create database tables
-    create_tables()
-    print("✅ Database tables created/verified")
-    
-    # Auto-scrape news on startup
-    print("🔄 Auto-scraping news on startup...")
-    result = scraper.scrape_and_store()
-    print(result)
-    
-    print("🎉 Smart News Chat Bot is ready!")
+    # Create tables, load models and auto-scrape in the background so the
+    # port binds immediately; /news/ready/ reports when warm-up is done
+    warmup.start(news_agent, scraper)
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
 
@@ -26,5 +26,21 @@ def get_db():
         db.close()
 
 def create_tables():
-    """Create all tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Create all tables, then add any columns and indexes missing from existing ones"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        upgrade_tables(conn)
+
+def upgrade_tables(conn):
+    """Additive schema upgrade: columns added to a model since its table was created"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
\ No newline at end of file
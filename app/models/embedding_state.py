@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Text, DateTime
+from datetime import datetime
+from .base import Base
+
+class EmbeddingState(Base):
+    __tablename__ = 'embedding_state'
+
+    # One row per embedded table
+    name = Column(Text, primary_key=True)
+    # Model whose vectors are in the live `embedding` column
+    active_model = Column(Text)
+    # Model being re-embedded into `embedding_shadow`, if any
+    target_model = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<EmbeddingState(name='{self.name}', active='{self.active_model}', target='{self.target_model}')>"
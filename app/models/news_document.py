@@ -1,18 +1,53 @@
-from sqlalchemy import Column, Integer, Text, DateTime
+from sqlalchemy import Column, Integer, BigInteger, Text, DateTime, ForeignKey
+from sqlalchemy.orm import deferred
 from datetime import datetime
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from config import Config
 from .base import Base
+from .story_cluster import StoryCluster  # noqa: F401  target of cluster_id
+
+# Range-partition by published_date on PostgreSQL when enabled. The partition
+# key must be part of the primary key, and foreign keys cannot point into a
+# partitioned table, so duplicate_of becomes a plain column.
+PARTITIONED = Config.NEWS_PARTITIONING and Config.DATABASE_URL.startswith('postgresql')
+
+# Half precision halves the table and HNSW index size at a negligible recall cost
+EMBEDDING_TYPE = HALFVEC if Config.EMBEDDING_STORAGE == 'halfvec' else Vector
 
 class NewsDocument(Base):
     __tablename__ = 'news_documents'
+    __table_args__ = {'postgresql_partition_by': 'RANGE (published_date)'} if PARTITIONED else {}
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(Text)
     content = Column(Text)
     category = Column(Text)
-    url = Column(Text)
-    published_date = Column(DateTime, default=datetime.utcnow)
-    embedding = Column(Vector(384))
+    # Indexed: ingest and backfill look up every incoming URL
+    url = Column(Text, index=True)
+    published_date = Column(DateTime, default=datetime.utcnow, primary_key=PARTITIONED, index=True)
+    # Vector columns are only read inside SQL, so loading an article never fetches them
+    embedding = deferred(Column(EMBEDDING_TYPE(384)), group='vectors')
+    # Model that produced `embedding`, and the shadow vectors of a model upgrade in progress
+    embedding_model = Column(Text, nullable=True)
+    embedding_shadow = deferred(Column(EMBEDDING_TYPE(384), nullable=True), group='vectors')
+    shadow_model = Column(Text, nullable=True)
+    # Sign bits of the embedding, for the Hamming prefilter (BINARY_PREFILTER), and of the shadow vectors
+    embedding_bits = deferred(Column(BIT(384), nullable=True), group='vectors')
+    embedding_bits_shadow = deferred(Column(BIT(384), nullable=True), group='vectors')
+
+    # Near-duplicate detection: 64-bit SimHash split into indexed 16-bit bands
+    simhash = Column(BigInteger)
+    simhash_band0 = Column(Integer, index=True)
+    simhash_band1 = Column(Integer, index=True)
+    simhash_band2 = Column(Integer, index=True)
+    simhash_band3 = Column(Integer, index=True)
+    duplicate_of = Column(Integer, *([] if PARTITIONED else [ForeignKey('news_documents.id')]), nullable=True, index=True)
+
+    # Short LLM digest (a few sentences plus key entities), generated once after ingest
+    digest = Column(Text, nullable=True)
+
+    # Story cluster this article was assigned to at ingest
+    cluster_id = Column(Integer, ForeignKey('story_clusters.id'), nullable=True, index=True)
     
     def __repr__(self):
-        return f"<NewsDocument(id={self.id}, title='{self.title[:50]}...')>"
\ No newline at end of file
+        return f"<NewsDocument(id={self.id}, title='{self.title[:50]}...')>"
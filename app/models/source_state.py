@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Text, DateTime
+from .base import Base
+
+class SourceState(Base):
+    __tablename__ = 'news_sources'
+
+    # Source spec, e.g. "newsapi" or "rss:https://example.com/feed.xml"
+    name = Column(Text, primary_key=True)
+    # Validators for conditional requests
+    etag = Column(Text)
+    last_modified = Column(Text)
+    # Newest item already ingested (ISO timestamp, or file mtime for directories)
+    cursor = Column(Text)
+    fetched_at = Column(DateTime)
+    status = Column(Text)
+
+    def __repr__(self):
+        return f"<SourceState(name='{self.name}', cursor='{self.cursor}')>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.orm import deferred
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from .base import Base
+
+class StoryCluster(Base):
+    __tablename__ = 'story_clusters'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    centroid = Column(Vector(384))
+    # Centroid over the shadow vectors, prepared before an embedding model switch
+    centroid_shadow = deferred(Column(Vector(384), nullable=True))
+    size = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<StoryCluster(id={self.id}, size={self.size})>"
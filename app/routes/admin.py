@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+from app.services.profiling import profiles, is_admin
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    """Require X-Admin-Token to match ADMIN_TOKEN; the admin API is closed while none is configured"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid or unconfigured admin token")
+
+
+# Initialize router
+admin_router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@admin_router.get("/profiles/")
+async def list_profiles():
+    """Recent request profiles, newest first"""
+    return {"profiles": profiles.list()}
+
+@admin_router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, sort: str = "cumulative", limit: int = 40, format: str = "json"):
+    """One profile as node timings plus pstats text, or the raw pstats file with format=pstats"""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            content=profile.dump(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+    try:
+        return profile.report(sort=sort, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key '{sort}'")
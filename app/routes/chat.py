@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.chat import ChatRequest
+import json
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.schemas.chat import ChatRequest, BatchSearchRequest
 from app.services.agent import NewsAgentGraph
+from app.services.clients import ProviderBusyError
+from app.services.profiling import should_profile, run_profiled
+from config import Config
 
 # Initialize router
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
@@ -14,13 +20,67 @@ def set_news_agent(agent: NewsAgentGraph):
     news_agent = agent
 
 @chat_router.post("/")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request, http_response: Response):
     """Handle chat requests"""
     try:
         if news_agent is None:
             raise HTTPException(status_code=500, detail="News agent not initialized")
         
-        response = news_agent.process_message(request.message, request.session_id)
+        # Run the blocking pipeline off the event loop so requests overlap
+        if should_profile(http_request.headers.get(Config.PROFILE_HEADER)):
+            response, profile_id = await run_in_threadpool(
+                run_profiled, "process_message", news_agent.process_message, request.message, request.session_id,
+                session_id=request.session_id
+            )
+            if profile_id:
+                http_response.headers["X-Profile-Id"] = profile_id
+        else:
+            response = await run_in_threadpool(news_agent.process_message, request.message, request.session_id)
         return {"response": response}
+    except ProviderBusyError as e:
+        # Shed load with a retry hint instead of an opaque error string
+        return JSONResponse(
+            status_code=503,
+            content={"response": f"❌ Service busy: {str(e)}"},
+            headers={"Retry-After": str(int(e.retry_after) or 1)}
+        )
     except Exception as e:
-        return {"response": f"❌ Error: {str(e)}"}
\ No newline at end of file
+        return {"response": f"❌ Error: {str(e)}"}
+
+@chat_router.post("/stream/")
+async def chat_stream(request: ChatRequest):
+    """
+    Handle a chat request as newline-delimited JSON events: one per plan
+    step as it finishes, then {"type": "done", "response": ...}
+    """
+    if news_agent is None:
+        raise HTTPException(status_code=500, detail="News agent not initialized")
+
+    def events():
+        try:
+            for event in news_agent.stream_message(request.message, request.session_id):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except ProviderBusyError as e:
+            yield json.dumps({"type": "error", "response": f"❌ Service busy: {str(e)}"}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "response": f"❌ Error: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    # Starlette iterates the blocking generator in its threadpool
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@chat_router.post("/batch/")
+async def chat_batch(request: BatchSearchRequest):
+    """
+    Answer many news queries in one call, in request order. `shed` counts
+    the responses turned away because the LLM provider had no capacity.
+    """
+    try:
+        if news_agent is None:
+            raise HTTPException(status_code=500, detail="News agent not initialized")
+
+        responses, shed = await run_in_threadpool(news_agent.tools.search_news_batch, request.queries, request.days)
+        return {"responses": responses, "shed": shed}
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"responses": [f"❌ Error: {str(e)}"] * len(request.queries), "shed": 0}
@@ -1,27 +1,63 @@
-from fastapi import APIRouter
+import os
+import re
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, JSONResponse, FileResponse
 from app.services.news_scraper import NewsScraper
+from app.services.memory import SessionMemory
+from app.services.metrics import render_metrics
+from app.services.warmup import warmup
 
 # Initialize router
 news_router = APIRouter(prefix="/news", tags=["news"])
 
-# Initialize scraper (this will be imported in main.py)
+# Reports written by NewsTools.create_pdf into the working directory
+REPORT_NAME = re.compile(r'^news_report_\d{8}_\d{6}_[0-9a-f]{16}\.pdf$')
+
+# Initialize scraper and the chat sessions that own reports (these will be imported in main.py)
 scraper = None
+sessions = None
 
 def set_scraper(news_scraper: NewsScraper):
     """Set the news scraper instance"""
     global scraper
     scraper = news_scraper
 
+def set_sessions(memory: SessionMemory):
+    """Set the session memory that records which session created each report"""
+    global sessions
+    sessions = memory
+
 @news_router.post("/scrape/")
 async def scrape_news():
     """Scrape and store news articles"""
     if scraper is None:
         return {"message": "❌ News scraper not initialized"}
     
-    result = scraper.scrape_and_store()
+    # Blocking (rate-limited provider calls): run it off the event loop
+    result = await run_in_threadpool(scraper.scrape_and_store)
     return {"message": result}
 
 @news_router.get("/health/")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "message": "News service is running"}
\ No newline at end of file
+    """Liveness endpoint: the process is up and serving"""
+    return {"status": "healthy", "message": "News service is running"}
+
+@news_router.get("/ready/")
+async def readiness_check():
+    """Readiness endpoint: models, clients and the agent graph are warmed up"""
+    snapshot = warmup.snapshot()
+    return JSONResponse(status_code=200 if warmup.ready.is_set() else 503, content=snapshot)
+
+@news_router.get("/metrics/", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@news_router.get("/reports/{filename}")
+async def download_report(filename: str, session_id: str = Query(...)):
+    """Download a generated PDF report; only the session that created it may"""
+    if (not REPORT_NAME.match(filename) or sessions is None
+            or not sessions.owns_report(session_id, filename) or not os.path.isfile(filename)):
+        raise HTTPException(status_code=404, detail="Report not found")
+    return FileResponse(filename, media_type="application/pdf", filename=filename)
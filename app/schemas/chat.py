@@ -1,12 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from config import Config
 from typing import Dict, List, Optional, Annotated
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 
+def merge_step_results(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Merge step results written by parallel plan branches"""
+    return {**(left or {}), **(right or {})}
+
 class ChatRequest(BaseModel):
     message: str
     session_id: str = "default"
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=Config.BATCH_MAX_QUERIES)
+    days: Optional[int] = None
+
 class AgentState(TypedDict):
     messages: Annotated[List[Dict], add_messages]
     session_id: str
@@ -17,4 +26,6 @@ class AgentState(TypedDict):
     conversation_type: Optional[str]
     user_intent: Optional[str]
     previous_actions: List[str]
-    waiting_for: Optional[str]
\ No newline at end of file
+    waiting_for: Optional[str]
+    plan: List[Dict]
+    step_results: Annotated[Dict[str, Dict], merge_step_results]
\ No newline at end of file
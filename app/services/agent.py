@@ -1,211 +1,412 @@
 import os
 import re
-from langchain_mistralai.chat_models import ChatMistralAI
+import time
+import threading
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from app.schemas.chat import AgentState
 from app.services.news_tools import NewsTools
+from app.services.browse import browse_views, CATEGORY_ALIASES, TRENDING_WORDS
 from app.services.memory import SessionMemory
-from app.services.news_scraper import NewsScraper
 from app.services.utils import message_to_dict, dict_to_message
+from app.services.metrics import timed, NODE_SECONDS, STEPS
+from app.services.profiling import profiled_node
+from app.services.factories import get_mistral_llm
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Target languages recognised in user prompts
+LANG_KEYWORDS = {
+    "hindi": "Hindi",
+    "french": "French",
+    "german": "German",
+    "japanese": "Japanese",
+    "spanish": "Spanish",
+    "chinese": "Chinese",
+    "arabic": "Arabic",
+    "russian": "Russian"
+}
+
+# Plan action -> graph node that executes it
+STEP_NODES = {
+    "search_news": "search_news",
+    "summarize": "summarize_news",
+    "translate": "translate",
+    "create_pdf": "create_pdf",
+    "send_email": "send_email",
+    "follow_up": "follow_up",
+    "browse": "browse_news"
+}
+
+# Recency phrases -> search window in days
+RECENCY_WINDOWS = [
+    ("today", 1),
+    ("yesterday", 2),
+    ("this week", 7),
+    ("past week", 7),
+    ("last week", 14),
+    ("this month", 31),
+    ("past month", 31)
+]
+
+# Words that do not make up a search topic on their own
+FILLER_WORDS = {
+    "a", "an", "the", "and", "then", "also", "to", "into", "in", "of", "on", "for", "about",
+    "with", "as", "it", "this", "that", "them", "these", "those", "me", "my", "us", "please",
+    "send", "create", "make", "get", "give", "show", "generate", "translate", "translated",
+    "summarize", "summarise", "summary", "pdf", "email", "mail", "news", "latest", "original",
+    "originals", "report", "can", "you", "i", "want", "need", "today", "yesterday", "week",
+    "month", "past", "last"
+}
+
+# Words that do not narrow a browse request ("what's the latest news")
+BROWSE_FILLER_WORDS = {"what", "s", "whats", "is", "are", "any", "some", "tell", "happening", "going", "new", "recent", "current"}
+
+ACTION_VERBS = r'(?:translate|summari[sz]e|create|make|send|e-?mail|generate|pdf)'
+CLAUSE_PATTERN = re.compile(r'[,;]|\b(?:and|then)\b(?=\s+' + ACTION_VERBS + r'\b)', re.IGNORECASE)
+LEADING_ACTION_PATTERN = re.compile(r'^\s*(?:(?:please|and|then|also)\s+)*' + ACTION_VERBS + r'\b\s*', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+
+
 class NewsAgentGraph:
     def __init__(self):
         self.tools = NewsTools()
         self.memory = SessionMemory()
-        self.scraper = NewsScraper()
         self.mistral_api_key = os.getenv('MISTRAL_API_KEY')
-        self.llm = ChatMistralAI(api_key=self.mistral_api_key)
-        self.graph = self._build_graph()
+        self._graph = None
+        self._graph_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        return get_mistral_llm()
+
+    @property
+    def graph(self):
+        """Compiled conversation graph, built on first use"""
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self._graph = self._build_graph()
+        return self._graph
 
     def _build_graph(self):
-        """Build the agent conversation graph"""
+        """Build the agent conversation graph.
+
+        The analysis node turns the message into a plan of steps. The
+        scheduler then fans out every step whose dependencies are done, so
+        independent steps run in the same superstep, and loops until the
+        plan is finished.
+        """
         g = StateGraph(AgentState)
         
         # Add nodes
         g.add_node("conversation_analysis", self._analyze_conversation)
-        g.add_node("search_news", self._search_news)
-        g.add_node("summarize_news", self._summarize_news)
-        g.add_node("translate", self._translate)
-        g.add_node("create_pdf", self._create_pdf)
-        g.add_node("send_email", self._send_email)
-        g.add_node("follow_up", self._follow_up)
+        g.add_node("schedule", self._schedule)
+        g.add_node("search_news", self._run_step(self._search_news))
+        g.add_node("browse_news", self._run_step(self._browse_news))
+        g.add_node("summarize_news", self._run_step(self._summarize_news))
+        g.add_node("translate", self._run_step(self._translate))
+        g.add_node("create_pdf", self._run_step(self._create_pdf))
+        g.add_node("send_email", self._run_step(self._send_email))
+        g.add_node("follow_up", self._run_step(self._follow_up))
+        g.add_node("respond", self._respond)
         
         # Set entry point
         g.set_entry_point("conversation_analysis")
+        g.add_edge("conversation_analysis", "schedule")
         
-        # Add conditional edges
-        g.add_conditional_edges("conversation_analysis", self._route, {
-            "search_news": "search_news",
-            "summarize": "summarize_news",
-            "translate": "translate",
-            "create_pdf": "create_pdf",
-            "send_email": "send_email",
-            "follow_up": "follow_up"
-        })
+        # Fan out ready steps, or finish once the plan is done
+        g.add_conditional_edges("schedule", self._route, list(STEP_NODES.values()) + ["respond"])
         
-        # Add edges to END
-        for node in ["search_news", "summarize_news", "translate", "create_pdf", "send_email", "follow_up"]:
-            g.add_edge(node, END)
+        # Every step reports back to the scheduler
+        for node in STEP_NODES.values():
+            g.add_edge(node, "schedule")
+        g.add_edge("respond", END)
             
         return g.compile()
 
     def _analyze_conversation(self, state):
-        """Analyze conversation to determine next action"""
-        message = state["messages"][-1].content.lower()
-        
-        if "translate" in message:
-            return {**state, "current_action": "translate"}
-        elif "summary" in message or "summarize" in message:
-            return {**state, "current_action": "summarize"}
-        elif "pdf" in message:
-            return {**state, "current_action": "create_pdf"}
-        elif "email" in message:
-            return {**state, "current_action": "send_email"}
-        elif "news" in message:
-            return {**state, "current_action": "search_news"}
-        else:
-            return {**state, "current_action": "follow_up"}
+        """Analyze conversation and plan the actions to run"""
+        message = state["messages"][-1].content
+        return {"plan": self._plan_steps(message), "step_results": {}}
+
+    def _plan_steps(self, message):
+        """Build a dependency-ordered plan of steps from the user message"""
+        text = message.lower()
+        steps = []
+
+        def add(action, depends_on=None, **args):
+            step_id = f"s{len(steps) + 1}"
+            steps.append({"id": step_id, "action": action, "args": args,
+                          "depends_on": [d for d in (depends_on or []) if d]})
+            return step_id
+
+        wants_translate = "translate" in text
+        wants_summary = "summary" in text or "summarize" in text
+        wants_pdf = "pdf" in text
+        wants_email = "email" in text
+        wants_other = wants_translate or wants_summary or wants_pdf or wants_email
+
+        # Search when news is asked for and, in compound requests, a topic is given
+        search_id = None
+        if "news" in text and (not wants_other or self._has_topic(message)):
+            days = next((d for phrase, d in RECENCY_WINDOWS if phrase in text), None)
+            topic = self._search_topic(message)
+            browse = self._browse_intent(topic)
+            if browse and browse_views.covers(days):
+                search_id = add("browse", topic=topic, days=days, **browse)
+            else:
+                search_id = add("search_news", topic=topic, days=days)
+
+        content_ids = [search_id]
+        if wants_summary:
+            content_ids = [add("summarize", [search_id])]
+
+        if wants_translate:
+            languages = [lang for keyword, lang in LANG_KEYWORDS.items() if keyword in text] or ["Hindi"]
+            content_ids = [add("translate", content_ids, language=lang) for lang in languages]
+
+        # Email needs a PDF; render one when the plan produces fresh content
+        pdf_id = None
+        has_content = any(content_ids)
+        if wants_pdf or (wants_email and has_content):
+            pdf_deps = [search_id] if "original" in text and search_id else content_ids
+            pdf_id = add("create_pdf", pdf_deps)
+
+        if wants_email:
+            email_match = EMAIL_PATTERN.search(message)
+            add("send_email", [pdf_id], email=email_match.group(0) if email_match else None)
+
+        if not steps:
+            add("follow_up")
+        return steps
+
+    def _search_topic(self, message):
+        """Extract the search part of a compound request"""
+        for clause in CLAUSE_PATTERN.split(message):
+            if clause and "news" in clause.lower():
+                topic = LEADING_ACTION_PATTERN.sub("", clause).strip(" .")
+                if self._has_topic(topic):
+                    return topic
+        return message
+
+    def _browse_intent(self, topic):
+        """Category and view for topics like 'latest news' or 'trending tech news', else None"""
+        words = [
+            w for w in re.findall(r'\w+', EMAIL_PATTERN.sub(" ", topic.lower()))
+            if w not in FILLER_WORDS and w not in LANG_KEYWORDS and w not in BROWSE_FILLER_WORDS
+        ]
+        kind = "trending" if any(w in TRENDING_WORDS for w in words) else "latest"
+        rest = [w for w in words if w not in TRENDING_WORDS]
+        categories = {CATEGORY_ALIASES.get(w) for w in rest}
+        if None in categories or len(categories) > 1:
+            return None
+        return {"category": next(iter(categories), None), "kind": kind}
+
+    def _has_topic(self, text):
+        """Check whether text names something to search for"""
+        text = EMAIL_PATTERN.sub(" ", text.lower())
+        words = re.findall(r'\w+', text)
+        return any(w not in FILLER_WORDS and w not in LANG_KEYWORDS for w in words)
+
+    def _schedule(self, state):
+        """Join point between plan stages"""
+        return {}
 
     def _route(self, state):
-        """Route to appropriate action"""
-        return state["current_action"]
+        """Dispatch every step whose dependencies have finished"""
+        done = state.get("step_results") or {}
+        ready = [
+            step for step in state.get("plan") or []
+            if step["id"] not in done and all(d in done for d in step["depends_on"])
+        ]
+        if not ready:
+            return "respond"
+        return [Send(STEP_NODES[step["action"]], {**state, "step": step}) for step in ready]
 
-    def _search_news(self, state):
-        """Search for news"""
-        topic = state["messages"][-1].content
-        response = self.tools.search_news(topic)
-        return {**state, "messages": state["messages"] + [AIMessage(content=response)]}
+    def _run_step(self, handler):
+        """Wrap a step handler so it reads its inputs and records its result"""
+        def node(state):
+            step = state["step"]
+            results = state.get("step_results") or {}
+            inputs = [results[d] for d in step["depends_on"]]
 
-    def _summarize_news(self, state):
-        """Summarize news content"""
-        # Find the last news output (look for the news header pattern)
-        last_news_msg = None
+            start = time.perf_counter()
+            if any(r["status"] != "ok" for r in inputs):
+                result = {"status": "skipped", "content": ""}
+            else:
+                with profiled_node(STEP_NODES[step["action"]]):
+                    result = handler(state, step, inputs)
+                content = result.get("content", "")
+                result["status"] = "error" if content.startswith(("❗", "❌")) else "ok"
+            NODE_SECONDS.observe(time.perf_counter() - start, node=STEP_NODES[step["action"]])
+            STEPS.inc(action=step["action"], status=result["status"])
+
+            result["action"] = step["action"]
+            return {"step_results": {step["id"]: result}}
+        return node
+
+    def _respond(self, state):
+        """Combine step outputs into the reply"""
+        results = state.get("step_results") or {}
+        outputs = [
+            results[step["id"]]["content"] for step in state.get("plan") or []
+            if step["id"] in results and results[step["id"]]["status"] != "skipped"
+        ]
+        response = "\n\n".join(outputs) if outputs else "🤖 I'm here to help!"
+        return {"messages": [AIMessage(content=response)]}
+
+    def _last_news(self, state):
+        """Find the last news output in the conversation history"""
         for msg in reversed(state["messages"]):
             if (isinstance(msg, AIMessage) and msg.content and 
                 not msg.content.startswith(("❗", "❌", "📄", "📧")) and
                 ("📰" in msg.content or "🔗" in msg.content)):
-                last_news_msg = msg.content
-                break
+                return msg.content
+        return None
+
+    def _search_news(self, state, step, inputs):
+        """Search for news"""
+        topic = step["args"].get("topic") or state["messages"][-1].content
+        return {"content": self.tools.search_news(topic, days=step["args"].get("days"))}
+
+    def _browse_news(self, state, step, inputs):
+        """Serve a browse request from the precomputed views, searching when the view is empty"""
+        args = step["args"]
+        content = browse_views.render(args.get("category"), args.get("kind", "latest"), args.get("days"))
+        if content is None:
+            return self._search_news(state, step, inputs)
+        return {"content": content}
+
+    def _summarize_news(self, state, step, inputs):
+        """Summarize news content"""
+        last_news_msg = "\n\n".join(r["content"] for r in inputs) if inputs else self._last_news(state)
         
         if not last_news_msg:
-            return {**state, "messages": state["messages"] + [
-                AIMessage(content="❗ No news content found to summarize. Please search for news first.")
-            ]}
+            return {"content": "❗ No news content found to summarize. Please search for news first."}
         
-        summary = self.tools.summarize_news(last_news_msg)
-        return {**state, "messages": state["messages"] + [AIMessage(content=summary)]}
+        return {"content": self.tools.summarize_news(last_news_msg)}
 
-    def _translate(self, state):
+    def _translate(self, state, step, inputs):
         """Translate news content"""
-        user_prompt = state["messages"][-1].content.lower()
-
-        # Find the last news output (look for the news header pattern)
-        last_news_msg = None
-        for msg in reversed(state["messages"]):
-            if (isinstance(msg, AIMessage) and msg.content and 
-                not msg.content.startswith(("❗", "❌", "📄", "📧")) and
-                ("📰" in msg.content or "🔗" in msg.content)):
-                last_news_msg = msg.content
-                break
+        last_news_msg = "\n\n".join(r["content"] for r in inputs) if inputs else self._last_news(state)
 
         if not last_news_msg:
-            return {**state, "messages": state["messages"] + [
-                AIMessage(content="❗ No news content found to translate. Please search for news first.")
-            ]}
-
-        # Detect target language
-        lang_keywords = {
-            "hindi": "Hindi",
-            "french": "French", 
-            "german": "German",
-            "japanese": "Japanese",
-            "spanish": "Spanish",
-            "chinese": "Chinese",
-            "arabic": "Arabic",
-            "russian": "Russian"
-        }
-        
-        target_lang = "Hindi"  # default
-        for keyword, lang in lang_keywords.items():
-            if keyword in user_prompt:
-                target_lang = lang
-                break
+            return {"content": "❗ No news content found to translate. Please search for news first."}
 
-        translated = self.tools.translate_text(last_news_msg, target_lang)
-        return {**state, "messages": state["messages"] + [AIMessage(content=translated)]}
+        target_lang = step["args"].get("language", "Hindi")
+        return {"content": self.tools.translate_text(last_news_msg, target_lang)}
 
-    def _create_pdf(self, state):
+    def _create_pdf(self, state, step, inputs):
         """Create PDF from content"""
-        # Get the last meaningful AI message content
-        content_to_pdf = None
-        for msg in reversed(state["messages"]):
-            if isinstance(msg, AIMessage) and msg.content and not msg.content.startswith("❗") and not msg.content.startswith("📄"):
-                content_to_pdf = msg.content
-                break
+        content_to_pdf = "\n\n".join(r["content"] for r in inputs) if inputs else None
+
+        # Otherwise use the last meaningful AI message content
+        if not content_to_pdf:
+            for msg in reversed(state["messages"]):
+                if isinstance(msg, AIMessage) and msg.content and not msg.content.startswith("❗") and not msg.content.startswith("📄"):
+                    content_to_pdf = msg.content
+                    break
         
         if not content_to_pdf:
-            return {**state, "messages": state["messages"] + [AIMessage(content="❗ No content available to create PDF. Please search or get news first.")]}
+            return {"content": "❗ No content available to create PDF. Please search or get news first."}
 
         # Create PDF with the actual content
         result = self.tools.create_pdf(content_to_pdf, "News Report")
         
-        # Store the PDF path in session for potential email sending
+        # Store the PDF path in session for potential email sending, and as downloadable by this session
+        pdf_filename = None
         if result.startswith("📄 PDF created successfully:"):
             pdf_filename = result.split(": ")[1]
-            session_data = self.memory.get_session(state["session_id"])
-            self.memory.update_session(state["session_id"], {"last_pdf_path": pdf_filename})
+            reports = self.memory.get_session(state["session_id"]).get("reports", [])
+            self.memory.update_session(state["session_id"], {"last_pdf_path": pdf_filename,
+                                                             "reports": reports + [pdf_filename]})
         
-        return {**state, "messages": state["messages"] + [AIMessage(content=result)]}
+        return {"content": result, "pdf_path": pdf_filename}
 
-    def _send_email(self, state):
+    def _send_email(self, state, step, inputs):
         """Send email with PDF attachment"""
-        user_input = state["messages"][-1].content
-
-        # Extract email address from user input
-        email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', user_input)
-        if not email_match:
-            return {**state, "messages": state["messages"] + [AIMessage(content="❗ Please provide a valid email address.")]}
-
-        email_address = email_match.group(0)
+        email_address = step["args"].get("email")
+        if not email_address:
+            return {"content": "❗ Please provide a valid email address."}
         
-        # Get the last created PDF path from session
-        session_data = self.memory.get_session(state["session_id"])
-        pdf_path = session_data.get("last_pdf_path")
+        # Prefer the PDF created in this plan, else the last one from session
+        pdf_path = next((r.get("pdf_path") for r in inputs if r.get("pdf_path")), None)
+        if not pdf_path:
+            session_data = self.memory.get_session(state["session_id"])
+            pdf_path = session_data.get("last_pdf_path")
         
         if not pdf_path:
-            return {**state, "messages": state["messages"] + [AIMessage(content="❗ No PDF found to send. Please create a PDF first.")]}
+            return {"content": "❗ No PDF found to send. Please create a PDF first."}
 
-        result = self.tools.send_email(email_address, pdf_path)
-        return {**state, "messages": state["messages"] + [AIMessage(content=result)]}
+        return {"content": self.tools.send_email(email_address, pdf_path)}
 
-    def _follow_up(self, state):
+    def _follow_up(self, state, step, inputs):
         """Provide follow-up options"""
         msg = "What would you like to do next? You can:\n• Search for news\n• Summarize content\n• Translate to another language\n• Create PDF\n• Send email"
-        return {**state, "messages": state["messages"] + [AIMessage(content=msg)]}
+        return {"content": msg}
 
     def process_message(self, message, session_id):
         """Process incoming message and return response"""
+        session_data, state = self._initial_state(message, session_id)
+        
+        with timed("chat"):
+            result = self.graph.invoke(state)
+        response = next((m.content for m in reversed(result["messages"]) if m.type == "ai"), "🤖 I'm here to help!")
+        
+        self._save_turn(session_id, session_data, state["messages"][-1], response)
+        return response
+
+    def stream_message(self, message, session_id):
+        """
+        Process a message, yielding each plan step's output as its node
+        finishes ({"type": "step", ...}) and then the combined reply
+        ({"type": "done", "response": ...}).
+        """
+        session_data, state = self._initial_state(message, session_id)
+        response, produced, failure = None, [], None
+
+        try:
+            with timed("chat_stream"):
+                for update in self.graph.stream(state, stream_mode="updates"):
+                    for node, output in update.items():
+                        if not output:
+                            continue
+                        if node == "respond":
+                            response = output["messages"][-1].content
+                        elif node in STEP_NODES.values():
+                            for result in output.get("step_results", {}).values():
+                                if result["status"] != "skipped":
+                                    produced.append(result["content"])
+                                    yield {"type": "step", "action": result["action"], "status": result["status"],
+                                           "content": result["content"]}
+        except Exception as e:
+            failure = f"❌ Error: {str(e)}"
+            raise
+        finally:
+            # Saved even when a step raises or the client disconnects, so follow-ups keep their context
+            if response is None:
+                response = "\n\n".join(produced + ([failure] if failure else [])) or "🤖 I'm here to help!"
+            self._save_turn(session_id, session_data, state["messages"][-1], response)
+        yield {"type": "done", "response": response}
+
+    def _initial_state(self, message, session_id):
         session_data = self.memory.get_session(session_id)
         history = [dict_to_message(m) for m in session_data.get("messages", [])]
-        new_message = HumanMessage(content=message)
-        
         state = {
-            "messages": history + [new_message],
-            "session_id": session_id
+            "messages": history + [HumanMessage(content=message)],
+            "session_id": session_id,
+            "plan": [],
+            "step_results": {}
         }
-        
-        result = self.graph.invoke(state)
-        response = next((m.content for m in reversed(result["messages"]) if m.type == "ai"), "🤖 I'm here to help!")
-        
-        # Update session with new messages
+        return session_data, state
+
+    def _save_turn(self, session_id, session_data, new_message, response):
+        """Update session with new messages"""
         updated_messages = session_data.get("messages", []) + [
             message_to_dict(new_message),
             message_to_dict(AIMessage(content=response))
         ]
         self.memory.update_session(session_id, {"messages": updated_messages})
-        
-        return response
\ No newline at end of file
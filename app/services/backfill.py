@@ -0,0 +1,326 @@
+"""
+Bulk historical backfill of news_documents from JSONL or CSV dumps.
+
+    python -m app.services.backfill archive.jsonl
+    python -m app.services.backfill archive.csv --batch-size 2000 --checkpoint archive.ckpt
+
+Records are NewsAPI-shaped (title, description, url, publishedAt, optional
+category). The dump is streamed in batches: each batch is embedded in one
+call, classified (unless the record carries a category), and loaded with
+PostgreSQL COPY, so memory stays constant whatever the dump size.
+
+Classification defaults to --classify local: the nearest category
+centroid to the embedding already computed, seeded from category
+descriptions and the stored labelled articles, so it costs no LLM calls.
+--classify llm sends BACKFILL_CLASSIFY_BATCH articles per Mistral prompt
+and is bound by MISTRAL_RATE; the progress line shows the resulting ETA. The
+checkpoint records how many input records are committed, so an
+interrupted run resumes where it stopped. Story clusters are assigned
+afterwards by the regular scrapes (assign_unclustered).
+"""
+import io
+import os
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, insert
+from config import Config
+from app.models.base import engine, upgrade_tables
+from app.models.news_document import NewsDocument
+from langchain_core.messages import HumanMessage
+from .news_scraper import parse_published
+from .browse import canonical_category
+from .clients import invoke_llm
+from .dedup import article_signature, signature_columns
+from .quantization import embedding_columns
+from .reembed import active_model_name
+from .partitions import ensure_partitions_for
+from .factories import get_embedding_model, get_mistral_llm
+from .metrics import timed
+
+COLUMNS = ["title", "content", "category", "url", "published_date", "embedding", "embedding_model", "embedding_bits",
+           "simhash", "simhash_band0", "simhash_band1", "simhash_band2", "simhash_band3"]
+
+
+# Seed text per category for the local classifier
+CATEGORY_DESCRIPTIONS = {
+    "Technology": "technology news: software, AI, smartphones, chips, the internet, cybersecurity, gadgets",
+    "Politics": "politics news: government, elections, parliament, ministers, policy, parties, legislation",
+    "Health": "health news: medicine, hospitals, disease, vaccines, public health, doctors, research trials",
+    "Sports": "sports news: football, cricket, tennis, matches, tournaments, players, coaches, championships",
+    "Business": "business news: companies, markets, earnings, deals, the economy, trade, industry",
+    "Finance": "finance news: stocks, banks, interest rates, investors, currencies, inflation, bonds",
+    "Science": "science news: research, space, physics, climate, biology, discoveries, experiments",
+    "Entertainment": "entertainment news: film, music, celebrities, television, streaming, awards, games",
+    "World": "world news: international affairs, conflicts, diplomacy, countries, foreign relations",
+    "Education": "education news: schools, universities, students, teachers, exams, curriculum",
+}
+
+# "12: Technology" lines in a batched classification answer
+CATEGORY_LINE = re.compile(r'^\s*\[?(\d+)\]?\s*[:.)-]\s*(.+?)\s*$', re.MULTILINE)
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid categories from article embeddings. Centroids start
+    from the category descriptions plus a sample of stored labelled
+    articles, and absorb the labelled records of the dump as it loads.
+    """
+    def __init__(self, model, model_name: str, sample: int = 5000):
+        vectors = model.encode(list(CATEGORY_DESCRIPTIONS.values()))
+        self.sums = {c: np.asarray(v, dtype=np.float64) for c, v in zip(CATEGORY_DESCRIPTIONS, vectors)}
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(NewsDocument.category, NewsDocument.embedding)
+                .where(NewsDocument.category.isnot(None), NewsDocument.embedding.isnot(None),
+                       NewsDocument.embedding_model == model_name)
+                .order_by(NewsDocument.id.desc())
+                .limit(sample)
+            ).all()
+        self.learn([(category, embedding) for category, embedding in rows])
+
+    def learn(self, labelled):
+        for category, embedding in labelled:
+            category = canonical_category(category)
+            vector = np.asarray(embedding, dtype=np.float64)
+            self.sums[category] = self.sums.get(category, 0) + vector / (np.linalg.norm(vector) or 1)
+        self.labels = list(self.sums)
+        matrix = np.stack([self.sums[c] for c in self.labels])
+        self.centroids = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    def classify(self, embeddings) -> list:
+        scores = np.asarray(embeddings, dtype=np.float64) @ self.centroids.T
+        return [self.labels[i] for i in scores.argmax(axis=1)]
+
+
+def classify_batch_with_mistral(texts: list) -> list:
+    """One Mistral call for many articles; None where the answer has no category"""
+    articles = "\n".join(f"[{i + 1}] {text[:300]}" for i, text in enumerate(texts))
+    prompt = (
+        "Give ONE short category (1-2 words) for each news article below. Examples: "
+        f"{', '.join(CATEGORY_DESCRIPTIONS)}.\n"
+        "Answer with one line per article in the form '<number>: <category>', nothing else.\n\n"
+        f"Articles:\n{articles}"
+    )
+    answer = invoke_llm("mistral", get_mistral_llm(), [HumanMessage(content=prompt)], stage="classification").content
+    categories = {int(n): c for n, c in CATEGORY_LINE.findall(answer or "")}
+    return [categories.get(i + 1) for i in range(len(texts))]
+
+
+def count_records(path: str, fmt: str = None) -> int:
+    """Approximate record count (lines), for the progress ETA"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, "rb") as f:
+        lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    return max(0, lines - 1) if fmt == "csv" else lines
+
+
+def format_duration(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+def read_records(path: str, fmt: str = None):
+    """Stream records from a JSONL or CSV file"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def load_checkpoint(path: str, source: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("source") == os.path.abspath(source):
+            return checkpoint
+    return {"source": os.path.abspath(source), "offset": 0, "loaded": 0, "skipped": 0}
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def prepare_batch(records: list, existing_urls: set) -> list:
+    """Normalize a batch of records, dropping invalid ones and URLs already stored"""
+    rows, seen = [], set()
+    for record in records:
+        title = (record.get("title") or "").strip()
+        url = (record.get("url") or "").strip()
+        if not title or not url or url in existing_urls or url in seen:
+            continue
+        seen.add(url)
+        desc = record.get("description") or record.get("content") or ""
+        rows.append({
+            "title": title,
+            "content": f"{title}. {desc}" if desc else title,
+            "category": record.get("category") or None,
+            "url": url,
+            "published_date": parse_published(record.get("publishedAt") or record.get("published_date")),
+            **signature_columns(article_signature(title, desc)),
+        })
+    return rows
+
+
+def _vector_literal(values) -> str:
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+def copy_rows(conn, rows: list):
+    """Load rows with COPY on PostgreSQL, or a multi-row INSERT elsewhere"""
+    if conn.dialect.name != "postgresql":
+        conn.execute(insert(NewsDocument), rows)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            _vector_literal(row[c]) if c == "embedding" else row.get(c)
+            for c in COLUMNS
+        ])
+    sql = f"COPY {NewsDocument.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def backfill(path: str, fmt: str = None, batch_size: int = 1000, checkpoint_path: str = None,
+             classify: str = "local", workers: int = None, report=None) -> dict:
+    """
+    Stream `path` into news_documents and return a throughput report.
+    `classify` is 'local' (nearest category centroid), 'llm' (batched
+    Mistral prompts) or 'none'.
+    """
+    # The URL index keeps the per-batch duplicate check off a sequential scan
+    with engine.begin() as conn:
+        upgrade_tables(conn)
+    checkpoint = load_checkpoint(checkpoint_path, path)
+    seconds = {"read": 0.0, "embed": 0.0, "classify": 0.0, "load": 0.0}
+    model_name = active_model_name(fresh=True)
+    model = get_embedding_model(model_name)
+    classifier = CentroidClassifier(model, model_name) if classify in ("local", "llm") else None
+    llm_batch = Config.BACKFILL_CLASSIFY_BATCH
+    pool = ThreadPoolExecutor(max_workers=workers or Config.MISTRAL_CONCURRENCY)
+    total = count_records(path, fmt) if report else None
+    records = islice(read_records(path, fmt), checkpoint["offset"], None)
+    started = time.perf_counter()
+    processed = unlabeled_seen = 0
+
+    try:
+        while True:
+            tick = time.perf_counter()
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            with engine.connect() as conn:
+                urls = [r.get("url") for r in batch if r.get("url")]
+                existing = set(conn.execute(select(NewsDocument.url).where(NewsDocument.url.in_(urls))).scalars())
+            rows = prepare_batch(batch, existing)
+            seconds["read"] += time.perf_counter() - tick
+
+            if rows:
+                tick = time.perf_counter()
+                with timed("embed"):
+                    vectors = model.encode([r["content"] for r in rows], batch_size=min(len(rows), 256))
+                for row, vector in zip(rows, vectors):
+                    row.update(embedding_columns(vector.tolist(), model_name))
+                seconds["embed"] += time.perf_counter() - tick
+
+                tick = time.perf_counter()
+                unlabeled = [i for i, r in enumerate(rows) if not r["category"]]
+                unlabeled_seen += len(unlabeled)
+                if classifier:
+                    classifier.learn([(rows[i]["category"], vectors[i]) for i in range(len(rows)) if rows[i]["category"]])
+                if classifier and unlabeled:
+                    with timed("backfill_classify"):
+                        local = classifier.classify([vectors[i] for i in unlabeled])
+                        if classify == "llm":
+                            # Many articles per prompt; provider limits in invoke_llm bound the real rate
+                            chunks = [unlabeled[i:i + llm_batch] for i in range(0, len(unlabeled), llm_batch)]
+                            answers = pool.map(classify_batch_with_mistral, [[rows[i]["content"] for i in c] for c in chunks])
+                            llm = [category for answer in answers for category in answer]
+                            local = [answer or fallback for answer, fallback in zip(llm, local)]
+                    for i, category in zip(unlabeled, local):
+                        rows[i]["category"] = category
+                seconds["classify"] += time.perf_counter() - tick
+
+                tick = time.perf_counter()
+                with timed("db_commit"), engine.begin() as conn:
+                    ensure_partitions_for(conn, [r["published_date"] for r in rows])
+                    copy_rows(conn, rows)
+                seconds["load"] += time.perf_counter() - tick
+
+            processed += len(batch)
+            checkpoint["offset"] += len(batch)
+            checkpoint["loaded"] += len(rows)
+            checkpoint["skipped"] += len(batch) - len(rows)
+            save_checkpoint(checkpoint_path, checkpoint)
+            if report:
+                elapsed = time.perf_counter() - started
+                remaining = max(0, total - checkpoint["offset"])
+                eta = remaining * elapsed / processed
+                line = f"{checkpoint['offset']}/{total} records, {checkpoint['loaded']} loaded, {processed / elapsed:.0f} records/s"
+                if classify == "llm":
+                    # Calls still needed at the observed unlabelled share, at MISTRAL_RATE calls per second
+                    calls = remaining * unlabeled_seen / processed / llm_batch
+                    eta = max(eta, calls / Config.MISTRAL_RATE)
+                    line += f", classification limited to {Config.MISTRAL_RATE * llm_batch:.0f} articles/s by MISTRAL_RATE"
+                report(f"{line}, ETA {format_duration(eta)}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **checkpoint,
+        "processed": processed,
+        "seconds": elapsed,
+        "records_per_second": processed / elapsed if elapsed else None,
+        "stage_seconds": seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill news_documents from a JSONL or CSV dump")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default <path>.checkpoint)")
+    parser.add_argument("--classify", choices=["local", "llm", "none"], default="local",
+                        help="How to fill categories missing from the dump (default: nearest category centroid)")
+    parser.add_argument("--no-classify", action="store_true", help="Same as --classify none")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent classification calls (--classify llm)")
+    args = parser.parse_args(argv)
+
+    result = backfill(
+        args.path, args.format, args.batch_size, args.checkpoint or f"{args.path}.checkpoint",
+        classify="none" if args.no_classify else args.classify, workers=args.workers,
+        report=lambda line: print(f"⏳ {line}", file=sys.stderr)
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
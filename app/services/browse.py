@@ -0,0 +1,207 @@
+"""
+Precomputed views for browse-style requests ("latest news", "tech news",
+"trending sports news"). An in-memory snapshot of the latest and most
+covered articles per normalized category is rebuilt after each ingest.
+A view's digest is generated on its first request and reused for the
+rest of the snapshot. Requests the snapshot cannot answer (an empty view,
+or a window longer than BROWSE_WINDOW_HOURS) go to vector search instead.
+"""
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from config import Config
+from app.models.base import SessionLocal
+from app.models.news_document import NewsDocument
+from app.models.story_cluster import StoryCluster
+from .singleflight import SingleFlight
+from .clients import invoke_llm
+from .metrics import timed
+from .factories import get_groq_llm
+
+ALL = "All"
+
+# Words users use for a category -> category label the classifier produces
+CATEGORY_ALIASES = {
+    "tech": "Technology", "technology": "Technology",
+    "politics": "Politics", "political": "Politics",
+    "health": "Health", "medical": "Health",
+    "sport": "Sports", "sports": "Sports",
+    "business": "Business", "economy": "Business",
+    "finance": "Finance", "financial": "Finance",
+    "science": "Science",
+    "entertainment": "Entertainment",
+    "world": "World", "international": "World",
+    "education": "Education",
+}
+
+TRENDING_WORDS = {"trending", "top", "popular", "biggest", "most", "covered", "headlines"}
+
+
+def canonical_category(category: str) -> str:
+    """Map a stored (LLM-produced) category onto one label per topic"""
+    category = re.sub(r'^Category:\s*', '', category or '')
+    category = re.sub(r'\(.*?\)', '', category).strip(" .")
+    if not category:
+        return "General"
+    return CATEGORY_ALIASES.get(category.lower(), category.title())
+
+
+class BrowseViews:
+    """
+    Snapshot of recent canonical articles, grouped by category into a
+    'latest' list (newest first) and a 'trending' list (most covered
+    stories first, one article per story cluster). Readers only ever see
+    a complete snapshot; refresh builds a new one and swaps it in.
+    """
+    def __init__(self):
+        self.snapshot = None
+        self.digests = {}
+        self.lock = threading.Lock()
+        self.digest_flight = SingleFlight()
+
+    def refresh(self, precompute_digests: bool = True) -> dict:
+        with timed("browse_refresh"):
+            snapshot = self._build()
+        with self.lock:
+            self.snapshot = snapshot
+            self.digests = {}
+        if precompute_digests and Config.BROWSE_PRECOMPUTE_DIGESTS:
+            threading.Thread(target=self._precompute, args=(snapshot,), name="browse-digests", daemon=True).start()
+        return {"categories": len(snapshot["views"]) - 1, "articles": snapshot["articles"]}
+
+    def _build(self) -> dict:
+        since = datetime.utcnow() - timedelta(hours=Config.BROWSE_WINDOW_HOURS)
+        copies = (
+            select(NewsDocument.duplicate_of.label("id"), func.count().label("copies"))
+            .where(NewsDocument.duplicate_of.isnot(None), NewsDocument.published_date >= since)
+            .group_by(NewsDocument.duplicate_of)
+            .subquery()
+        )
+        stmt = (
+            select(
+                NewsDocument.id, NewsDocument.title, NewsDocument.url, NewsDocument.content, NewsDocument.digest,
+                NewsDocument.category, NewsDocument.published_date, NewsDocument.cluster_id,
+                StoryCluster.size, copies.c.copies
+            )
+            .outerjoin(StoryCluster, StoryCluster.id == NewsDocument.cluster_id)
+            .outerjoin(copies, copies.c.id == NewsDocument.id)
+            .where(NewsDocument.duplicate_of.is_(None), NewsDocument.published_date >= since)
+            .order_by(NewsDocument.published_date.desc())
+            .limit(Config.BROWSE_MAX_ARTICLES)
+        )
+        session = SessionLocal()
+        try:
+            rows = session.execute(stmt).all()
+        finally:
+            session.close()
+
+        grouped = {ALL: []}
+        for row in rows:
+            article = {
+                "title": row.title,
+                "url": row.url,
+                "content": row.content,
+                "digest": row.digest,
+                "category": canonical_category(row.category),
+                "published": row.published_date,
+                "cluster_id": row.cluster_id,
+                "coverage": (row.size or 1) + (row.copies or 0),
+            }
+            grouped[ALL].append(article)
+            grouped.setdefault(article["category"], []).append(article)
+
+        size = Config.BROWSE_ARTICLES
+        views = {}
+        for category, articles in grouped.items():
+            trending, seen = [], set()
+            for article in sorted(articles, key=lambda a: (-a["coverage"], -a["published"].timestamp())):
+                story = article["cluster_id"] or f"article-{article['url']}"
+                if story not in seen:
+                    seen.add(story)
+                    trending.append(article)
+            views[category] = {"latest": articles[:size], "trending": trending[:size]}
+        return {"views": views, "articles": len(rows), "refreshed_at": time.time(), "version": time.monotonic()}
+
+    def _precompute(self, snapshot):
+        # Only the labels users can ask for by name, not every label the classifier produced
+        for category in [ALL, *sorted(set(CATEGORY_ALIASES.values()) & set(snapshot["views"]))]:
+            if self.snapshot is not snapshot:
+                return
+            try:
+                self.digest(category, "latest")
+            except Exception as e:
+                print(f"❌ Browse digest for {category} failed: {e}")
+
+    def current(self) -> dict:
+        """The current snapshot, rebuilt when missing or older than BROWSE_MAX_AGE_SECONDS"""
+        snapshot = self.snapshot
+        if snapshot is None or time.time() - snapshot["refreshed_at"] > Config.BROWSE_MAX_AGE_SECONDS:
+            self.digest_flight.do("refresh", self.refresh)
+            snapshot = self.snapshot
+        return snapshot
+
+    def articles(self, category: str = None, kind: str = "latest", days: int = None, snapshot: dict = None) -> list:
+        view = (snapshot or self.current())["views"].get(category or ALL)
+        if not view:
+            return []
+        articles = view[kind]
+        if days:
+            since = datetime.utcnow() - timedelta(days=days)
+            articles = [a for a in articles if a["published"] >= since]
+        return articles
+
+    def digest(self, category: str = None, kind: str = "latest", days: int = None) -> str:
+        """LLM digest of exactly the articles a view shows, generated once per snapshot"""
+        snapshot = self.current()
+        articles = self.articles(category, kind, days, snapshot)
+        key = (snapshot["version"], category or ALL, kind, tuple(a["url"] for a in articles))
+        cached = self.digests.get(key)
+        if cached is None:
+            cached = self.digest_flight.do(key, self._digest, articles, category or ALL, kind)
+            with self.lock:
+                if self.snapshot is snapshot:
+                    self.digests[key] = cached
+        return cached
+
+    def _digest(self, articles, category, kind) -> str:
+        headlines = "\n".join(f"- {a['title']}: {a['digest'] or (a['content'] or '')[:200]}" for a in articles)
+        label = "news" if category == ALL else f"{category} news"
+        prompt = (
+            f"Write a short digest of the {kind} {label} from these articles. "
+            "Give 3-5 bullet points covering the main stories.\n\n"
+            f"Articles:\n{headlines}\n\nDigest:"
+        )
+        return invoke_llm("groq", get_groq_llm(), prompt, stage="digest_llm").content
+
+    def covers(self, days: int = None) -> bool:
+        """Whether a `days` window fits inside the snapshot's window"""
+        return days is None or days * 24 <= Config.BROWSE_WINDOW_HOURS
+
+    def render(self, category: str = None, kind: str = "latest", days: int = None):
+        """Browse reply in the same shape as search_news output, or None when the view is empty"""
+        with timed("browse"):
+            articles = self.articles(category, kind, days)
+            label = "" if not category or category == ALL else f"{category} "
+            if not articles:
+                return None
+            try:
+                digest = self.digest(category, kind, days)
+            except Exception as e:
+                digest = f"(digest unavailable: {e})"
+            chunks = [
+                f"📰 **Title:** {a['title']}\n"
+                f"🔗 **URL:** {a['url']}\n"
+                f"📂 **Category:** {a['category']}\n"
+                f"📅 **Published:** {a['published']:%Y-%m-%d %H:%M}\n"
+                f"📜 **Content:**\n{a['content']}\n"
+                + "-" * 60
+                for a in articles
+            ]
+            heading = "Trending" if kind == "trending" else "Latest"
+            return f"🤖 {digest}\n\n📌 {heading} {label}News:\n" + "\n\n".join(chunks)
+
+
+# Shared by the scraper (refresh) and the agent (reads)
+browse_views = BrowseViews()
@@ -0,0 +1,260 @@
+import time
+import random
+import threading
+import requests
+from config import Config
+from app.services.metrics import timed, record_tokens, register_collector, PROVIDER_WAIT_SECONDS
+
+
+class ProviderBusyError(Exception):
+    """Raised when a provider has no capacity left and the call is shed"""
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is at capacity, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def reserve(self, count: int, timeout: float, share: float = 1.0) -> list:
+        """
+        Take up to `count` tokens at once, at most `share` of those that
+        will have refilled within `timeout`. Returns the monotonic time
+        each granted token is due.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = max(0, min(count, int(share * (self.tokens + timeout * self.rate))))
+            due = [now + max(0.0, (i + 1 - self.tokens) / self.rate) for i in range(granted)]
+            self.tokens -= granted
+            return due
+
+    def refund(self, count: int):
+        """Return reserved tokens that were never used"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + count)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nobody calls before `seconds` have passed"""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.updated = time.monotonic()
+
+
+class Reservation:
+    """
+    Tokens a batch reserved in one go. Each call made with it waits for
+    the next granted token instead of queueing for the bucket, so every
+    admitted call is guaranteed its turn within the queue timeout.
+    """
+    def __init__(self, limiter, due: list):
+        self.limiter = limiter
+        self.due = due
+        self.granted = len(due)
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Wait for the next reserved token; False once all are used"""
+        with self.lock:
+            if not self.due:
+                return False
+            due = self.due.pop(0)
+        time.sleep(max(0.0, due - time.monotonic()))
+        return True
+
+    def release(self):
+        """Hand unused tokens back to the limiter"""
+        with self.lock:
+            unused, self.due = len(self.due), []
+        if unused:
+            self.limiter.bucket.refund(unused)
+
+
+class ProviderLimiter:
+    """
+    Rate limit, concurrency limit and retry policy for one upstream provider.
+    Calls wait in a bounded queue; when the queue is full or the wait
+    exceeds `queue_timeout` they are shed with ProviderBusyError.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, name, rate, burst, concurrency, max_queue, queue_timeout, max_retries):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.stats = {"queued": 0, "in_flight": 0, "calls": 0, "retries": 0, "rejected": 0, "errors": 0}
+
+    def _count(self, key, delta=1):
+        with self.lock:
+            self.stats[key] += delta
+
+    def reserve(self, count: int, share: float = 1.0) -> Reservation:
+        """
+        Reserve up to `count` calls that can start within the queue timeout,
+        taking at most `share` of that capacity so other callers keep the rest.
+        """
+        return Reservation(self, self.bucket.reserve(count, self.queue_timeout, share))
+
+    def _enter(self, reservation: Reservation = None):
+        if reservation is not None and reservation.take():
+            self.slots.acquire()
+            self._count("in_flight")
+            return
+        with self.lock:
+            if self.stats["queued"] >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise ProviderBusyError(self.name, self.queue_timeout)
+            self.stats["queued"] += 1
+
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        try:
+            if not self.slots.acquire(timeout=self.queue_timeout):
+                self._count("rejected")
+                raise ProviderBusyError(self.name, self.queue_timeout)
+            if not self.bucket.acquire(max(0.0, deadline - time.monotonic())):
+                self.slots.release()
+                self._count("rejected")
+                raise ProviderBusyError(self.name, 1 / self.bucket.rate)
+        finally:
+            self._count("queued", -1)
+            PROVIDER_WAIT_SECONDS.observe(time.monotonic() - start, provider=self.name)
+        self._count("in_flight")
+
+    def _exit(self):
+        self._count("in_flight", -1)
+        self.slots.release()
+
+    def call(self, fn, *args, reservation: Reservation = None, **kwargs):
+        """
+        Run fn under this provider's limits, retrying throttled calls. The
+        first attempt uses a token from `reservation` when one is left.
+        """
+        attempt = 0
+        while True:
+            self._enter(reservation if attempt == 0 else None)
+            try:
+                self._count("calls")
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status, retry_after = _error_status(e)
+                if status not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    self._count("errors")
+                    raise
+                delay = retry_after if retry_after is not None else min(30.0, 2 ** attempt + random.random())
+                if status == 429:
+                    self.bucket.pause(delay)
+            finally:
+                self._exit()
+            attempt += 1
+            self._count("retries")
+            time.sleep(delay)
+
+
+def _error_status(error):
+    """Extract HTTP status and Retry-After seconds from a client exception"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            retry_after = float(value) if value is not None else None
+        except ValueError:
+            retry_after = None
+    return status, retry_after
+
+
+def _limiter(name, prefix):
+    return ProviderLimiter(
+        name,
+        rate=getattr(Config, f"{prefix}_RATE"),
+        burst=getattr(Config, f"{prefix}_BURST"),
+        concurrency=getattr(Config, f"{prefix}_CONCURRENCY"),
+        max_queue=Config.PROVIDER_MAX_QUEUE,
+        queue_timeout=Config.PROVIDER_QUEUE_TIMEOUT,
+        max_retries=Config.PROVIDER_MAX_RETRIES
+    )
+
+
+# One limiter per provider, shared by every client in the process
+limiters = {
+    "groq": _limiter("groq", "GROQ"),
+    "mistral": _limiter("mistral", "MISTRAL"),
+    "newsapi": _limiter("newsapi", "NEWSAPI"),
+    "feeds": _limiter("feeds", "FEEDS"),
+}
+
+http = requests.Session()
+
+
+@register_collector
+def _limiter_metrics():
+    gauges = ("queued", "in_flight")
+    return [
+        (f"news_provider_{key}" + ("" if key in gauges else "_total"),
+         "gauge" if key in gauges else "counter",
+         f"Provider calls {key.replace('_', ' ')}",
+         [({"provider": name}, limiter.stats[key]) for name, limiter in limiters.items()])
+        for key in ("queued", "in_flight", "calls", "retries", "rejected", "errors")
+    ]
+
+
+def invoke_llm(provider: str, llm, *args, stage: str = "llm", reservation: Reservation = None, **kwargs):
+    """Invoke a LangChain chat model under the provider's limits"""
+    def run():
+        with timed(stage):
+            return llm.invoke(*args, **kwargs)
+    response = limiters[provider].call(run, reservation=reservation)
+    record_tokens(provider, stage, response)
+    return response
+
+
+def http_get_json(provider: str, url: str, stage: str = "http", **kwargs):
+    """GET a JSON document under the provider's limits"""
+    def fetch():
+        with timed(stage):
+            response = http.get(url, timeout=Config.HTTP_TIMEOUT, **kwargs)
+            response.raise_for_status()
+            return response.json()
+    return limiters[provider].call(fetch)
+
+
+def http_get(provider: str, url: str, stage: str = "http", **kwargs):
+    """GET a URL under the provider's limits; 304 Not Modified is returned, not raised"""
+    def fetch():
+        with timed(stage):
+            response = http.get(url, timeout=Config.HTTP_TIMEOUT, **kwargs)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+    return limiters[provider].call(fetch)
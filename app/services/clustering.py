@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, update, bindparam
+from config import Config
+from app.models.news_document import NewsDocument
+from app.models.story_cluster import StoryCluster
+
+
+def assign_cluster(session, embedding) -> StoryCluster:
+    """
+    Put an embedding into the nearest recently active story cluster, or
+    open a new one. The centroid is updated as a running mean.
+    """
+    since = datetime.utcnow() - timedelta(hours=Config.CLUSTER_WINDOW_HOURS)
+    distance = StoryCluster.centroid.cosine_distance(embedding).label("distance")
+    row = session.execute(
+        select(StoryCluster, distance)
+        .where(StoryCluster.updated_at >= since)
+        .order_by(distance)
+        .limit(1)
+    ).first()
+
+    vector = np.asarray(embedding, dtype=np.float32)
+    if row is not None and row[1] is not None and row[1] <= Config.CLUSTER_MAX_DISTANCE:
+        cluster = row[0]
+        size = cluster.size or 0
+        centroid = np.asarray(cluster.centroid, dtype=np.float32)
+        cluster.centroid = ((centroid * size + vector) / (size + 1)).tolist()
+        cluster.size = size + 1
+        cluster.updated_at = datetime.utcnow()
+        return cluster
+
+    cluster = StoryCluster(centroid=vector.tolist(), size=1)
+    session.add(cluster)
+    session.flush()
+    return cluster
+
+
+def assign_unclustered(session, limit: int = 200) -> int:
+    """Cluster articles stored before clustering existed, oldest first"""
+    rows = session.execute(
+        select(NewsDocument.id, NewsDocument.embedding)
+        .where(NewsDocument.cluster_id.is_(None), NewsDocument.duplicate_of.is_(None), NewsDocument.embedding.isnot(None))
+        .order_by(NewsDocument.id)
+        .limit(limit)
+    ).all()
+    if rows:
+        table = NewsDocument.__table__
+        session.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(cluster_id=bindparam("cluster_id")),
+            [{"row_id": row.id, "cluster_id": assign_cluster(session, row.embedding).id} for row in rows]
+        )
+    return len(rows)
@@ -0,0 +1,95 @@
+import re
+import hashlib
+from sqlalchemy import or_, func, cast
+from sqlalchemy.dialects.postgresql import BIT
+from app.models.news_document import NewsDocument
+
+SIMHASH_BITS = 64
+BAND_BITS = 16
+BANDS = SIMHASH_BITS // BAND_BITS
+
+# Publisher suffixes NewsAPI appends to syndicated titles ("... - Reuters")
+SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{1,60}$')
+
+
+def normalize_title(title: str) -> str:
+    return SOURCE_SUFFIX.sub('', title or '').strip()
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over word bigrams. Texts differing in a few words
+    produce signatures a small Hamming distance apart.
+    """
+    tokens = re.findall(r'\w+', (text or '').lower())
+    shingles = [" ".join(tokens[i:i + 2]) for i in range(max(1, len(tokens) - 1))] if tokens else []
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def article_signature(title: str, description: str) -> int:
+    return simhash(f"{normalize_title(title)} {description or ''}")
+
+
+def to_signed(value: int) -> int:
+    """Map an unsigned 64-bit signature onto a signed BIGINT"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def signature_bands(signature: int) -> list:
+    """
+    Split the signature into 16-bit bands. Two signatures within Hamming
+    distance 3 share at least one band exactly, so the indexed bands find
+    every candidate.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [(signature >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def signature_columns(signature: int) -> dict:
+    """Column values to store on a NewsDocument for this signature"""
+    bands = signature_bands(signature)
+    return {
+        "simhash": to_signed(signature),
+        **{f"simhash_band{i}": band for i, band in enumerate(bands)}
+    }
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+def find_near_duplicate(session, signature: int, max_distance: int, limit: int = 200):
+    """
+    Return the canonical NewsDocument id closest to `signature` within
+    `max_distance` bits, or None. Band matches are ranked by Hamming
+    distance in SQL on PostgreSQL (newest first elsewhere) before the
+    limit, so a crowded band value cannot push out the closest match.
+    """
+    bands = signature_bands(signature)
+    query = (
+        session.query(NewsDocument.id, NewsDocument.simhash, NewsDocument.duplicate_of)
+        .filter(or_(*[getattr(NewsDocument, f"simhash_band{i}") == band for i, band in enumerate(bands)]))
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        distance = func.bit_count(cast(NewsDocument.simhash.op("#")(to_signed(signature)), BIT(SIMHASH_BITS)))
+        query = query.order_by(distance, NewsDocument.id.desc())
+    else:
+        query = query.order_by(NewsDocument.id.desc())
+    candidates = query.limit(limit).all()
+    best = None
+    for doc_id, doc_signature, duplicate_of in candidates:
+        if doc_signature is None:
+            continue
+        distance = hamming(signature, doc_signature)
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, duplicate_of or doc_id)
+    return best[1] if best else None
@@ -0,0 +1,117 @@
+import re
+import threading
+from sqlalchemy import select, func
+from config import Config
+from app.models.base import SessionLocal
+from app.models.news_document import NewsDocument
+from .clients import invoke_llm
+from .metrics import timed
+from .factories import get_groq_llm
+
+# "[3] digest text..." blocks in the batched digest answer
+DIGEST_BLOCK = re.compile(r'^\s*\[(\d+)\]\s*(.*?)(?=^\s*\[\d+\]|\Z)', re.DOTALL | re.MULTILINE)
+
+
+# Background digest runs, one at a time
+_running = threading.Lock()
+
+
+def digest_limit(doc) -> int:
+    """Longest useful digest: DIGEST_MAX_CHARS, and at most half the article"""
+    return min(Config.DIGEST_MAX_CHARS, len(doc.content or "") // 2)
+
+
+def shorten(text: str, limit: int) -> str:
+    """Cut text to `limit` characters at a word boundary"""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0].rstrip(" ,;:") + "…"
+
+
+def digest_prompt(docs: list) -> str:
+    articles = "\n\n".join(
+        f"[{i + 1}] (at most {digest_limit(doc)} characters) {doc.title}\n{doc.content}" for i, doc in enumerate(docs)
+    )
+    return (
+        "Write a digest for each article below: 1-2 sentences on what happened, "
+        "then a line 'Entities:' listing the key people, organisations and places. "
+        "Keep each digest within its character limit. "
+        "Answer with one block per article, each starting with its number in brackets, like [1].\n\n"
+        f"Articles:\n{articles}"
+    )
+
+
+def parse_digests(text: str) -> dict:
+    """Map article number -> digest from a batched answer"""
+    return {int(n): body.strip() for n, body in DIGEST_BLOCK.findall(text or "") if body.strip()}
+
+
+def generate_digests(docs: list, batch_size: int = None) -> int:
+    """
+    Set `digest` on articles, one LLM call per batch. Articles whose
+    digest is missing from the answer keep NULL and are retried later.
+    """
+    batch_size = batch_size or Config.DIGEST_BATCH_SIZE
+    done = 0
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        with timed("digests"):
+            answer = invoke_llm("groq", get_groq_llm(), digest_prompt(batch), stage="article_digest_llm").content
+        digests = parse_digests(answer)
+        for i, doc in enumerate(batch):
+            if digests.get(i + 1):
+                doc.digest = shorten(digests[i + 1], digest_limit(doc))
+                done += 1
+    return done
+
+
+def fill_missing_digests(session, limit: int = None) -> int:
+    """
+    Digest the newest canonical articles stored without one. Articles
+    shorter than DIGEST_MIN_CHARS (about a headline plus one sentence) are
+    used as they are and never digested.
+    """
+    docs = session.execute(
+        select(NewsDocument)
+        .where(NewsDocument.digest.is_(None), NewsDocument.duplicate_of.is_(None),
+               func.length(NewsDocument.content) >= Config.DIGEST_MIN_CHARS)
+        .order_by(NewsDocument.id.desc())
+        .limit(limit if limit is not None else Config.DIGEST_BACKFILL_LIMIT)
+    ).scalars().all()
+    return generate_digests(docs) if docs else 0
+
+
+def digest_in_background(limit: int = None):
+    """
+    Run fill_missing_digests in a daemon thread with its own session, so
+    ingest never waits on the LLM. Skipped while a previous run is busy.
+    """
+    if not _running.acquire(blocking=False):
+        return None
+
+    def run():
+        session = SessionLocal()
+        try:
+            fill_missing_digests(session, limit)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"❌ Article digests failed: {e}")
+        finally:
+            session.close()
+            _running.release()
+
+    thread = threading.Thread(target=run, name="article-digests", daemon=True)
+    thread.start()
+    return thread
+
+
+def digests_for_urls(session, urls: list) -> dict:
+    """(content, digest) of digested articles, keyed by URL"""
+    if not urls:
+        return {}
+    rows = session.execute(
+        select(NewsDocument.url, NewsDocument.content, NewsDocument.digest)
+        .where(NewsDocument.url.in_(urls), NewsDocument.digest.isnot(None))
+    ).all()
+    return {url: (content, digest) for url, content, digest in rows}
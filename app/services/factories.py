@@ -0,0 +1,56 @@
+import threading
+from config import Config
+
+# Heavy components are built on first use (or during warm-up), never at import
+_instances = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _get(name, build):
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _locks_guard:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _instances:
+            _instances[name] = build()
+        return _instances[name]
+
+
+def is_built(name: str) -> bool:
+    return name in _instances
+
+
+def get_embedding_model(name: str = None):
+    """Shared sentence-transformers model used for search and ingest (default EMBEDDING_MODEL)"""
+    name = name or Config.EMBEDDING_MODEL
+    def build():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(name)
+    return _get(f"embedding_model:{name}", build)
+
+
+def get_groq_llm():
+    """Shared Groq chat model used by the news tools"""
+    def build():
+        from langchain_groq.chat_models import ChatGroq
+        if not Config.GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY is missing")
+        return ChatGroq(
+            api_key=Config.GROQ_API_KEY,
+            model_name="llama3-70b-8192",
+            temperature=0.2,
+            timeout=Config.LLM_TIMEOUT,
+            max_retries=0  # retries are handled by the shared client layer
+        )
+    return _get("groq_llm", build)
+
+
+def get_mistral_llm():
+    """Shared Mistral chat model used for category classification"""
+    def build():
+        from langchain_mistralai.chat_models import ChatMistralAI
+        return ChatMistralAI(api_key=Config.MISTRAL_API_KEY, timeout=Config.LLM_TIMEOUT, max_retries=0)
+    return _get("mistral_llm", build)
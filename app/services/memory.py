@@ -13,7 +13,8 @@ class SessionMemory:
                 "user_intent": None,
                 "previous_actions": [], 
                 "waiting_for": None,
-                "last_pdf_path": None  # Add this to track the last created PDF
+                "last_pdf_path": None,  # Add this to track the last created PDF
+                "reports": []  # Every PDF this session created, the only ones it may download
             }
         return self.sessions[session_id]
     
@@ -24,6 +25,10 @@ class SessionMemory:
         else:
             self.sessions[session_id] = updates
     
+    def owns_report(self, session_id, filename):
+        """Whether the session created the report `filename`"""
+        return filename in self.sessions.get(session_id, {}).get("reports", [])
+
     def clear_session(self, session_id):
         """Clear a specific session"""
         if session_id in self.sessions:
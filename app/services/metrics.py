@@ -0,0 +1,138 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, wide enough for LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+_collectors = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            return [f"{self.name}{_format_labels(self.label_names, k)} {v}" for k, v in self.values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self.lock:
+            series = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                for bound, c in zip(self.buckets, counts):
+                    labels = _format_labels(self.label_names + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {c}")
+                labels = _format_labels(self.label_names + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def register_collector(fn):
+    """
+    Register a callable returning (name, kind, help, [(labels_dict, value)])
+    tuples, evaluated at scrape time for state owned by other modules.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, kind, help_text, samples in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("news_stage_duration_seconds", "Duration of pipeline stages", ["stage"])
+STAGE_ERRORS = Counter("news_stage_errors_total", "Pipeline stages that raised", ["stage"])
+NODE_SECONDS = Histogram("news_graph_node_duration_seconds", "Duration of agent graph nodes", ["node"])
+STEPS = Counter("news_graph_steps_total", "Agent plan steps by outcome", ["action", "status"])
+LLM_TOKENS = Counter("news_llm_tokens_total", "LLM tokens used", ["provider", "stage", "kind"])
+NEAR_DUPLICATES = Counter("news_ingest_near_duplicates_total", "Ingested articles detected as near-duplicates", ["policy"])
+PROVIDER_WAIT_SECONDS = Histogram("news_provider_wait_seconds", "Time spent waiting for provider capacity", ["provider"])
+
+
+@contextmanager
+def timed(stage):
+    """Time a block as a pipeline stage, counting exceptions as errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_tokens(provider, stage, response):
+    """Count prompt and completion tokens reported on a chat model response"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt = usage.get("input_tokens")
+    completion = usage.get("output_tokens")
+    if prompt is None:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens")
+        completion = token_usage.get("completion_tokens")
+    if prompt:
+        LLM_TOKENS.inc(prompt, provider=provider, stage=stage, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, provider=provider, stage=stage, kind="completion")
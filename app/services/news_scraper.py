@@ -1,18 +1,53 @@
 import os
-import requests
-from sentence_transformers import SentenceTransformer
-from app.models.base import SessionLocal
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import select, func
+from app.models.base import SessionLocal, engine
 from app.models.news_document import NewsDocument
 from langchain_core.messages import HumanMessage
-from langchain_mistralai.chat_models import ChatMistralAI
 from dotenv import load_dotenv
 from config import Config
+from app.services.clients import invoke_llm
+from app.services.metrics import timed, NEAR_DUPLICATES
+from app.services.dedup import article_signature, signature_columns, find_near_duplicate
+from app.services.clustering import assign_cluster, assign_unclustered
+from app.services.partitions import maintain_partitions, ensure_partitions_for
+from app.services.quantization import embedding_columns
+from app.services.reembed import active_model_name
+from app.services.sources import build_sources, load_states, save_state, fetch_all
+from app.services.browse import browse_views
+from app.services.digests import digest_in_background
+from app.services.factories import get_embedding_model, get_mistral_llm
 
 load_dotenv()
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+_corpus = {"version": None, "at": 0.0}
+
+
+def corpus_version() -> int:
+    """
+    Highest stored article id, cached for CORPUS_VERSION_TTL seconds.
+    Read from the database, so every API worker sees ingests made by
+    other processes (backfill) within the TTL; a local scrape re-reads it.
+    """
+    now = time.monotonic()
+    if _corpus["version"] is None or now - _corpus["at"] > Config.CORPUS_VERSION_TTL:
+        session = SessionLocal()
+        try:
+            version = session.execute(select(func.max(NewsDocument.id))).scalar() or 0
+        except Exception:
+            # Table not created yet
+            version = _corpus["version"] or 0
+        finally:
+            session.close()
+        _corpus.update(version=version, at=now)
+    return _corpus["version"]
+
+
+def invalidate_corpus_version():
+    _corpus["version"] = None
 
-llm = ChatMistralAI(api_key=Config.MISTRAL_API_KEY)
 
 def classify_category_with_mistral(text: str) -> str:
     prompt = f"""
@@ -25,60 +60,160 @@ def classify_category_with_mistral(text: str) -> str:
     Respond with only the category name, nothing else.
     """
 
-    response = llm.invoke([HumanMessage(content=prompt)])
+    response = invoke_llm("mistral", get_mistral_llm(), [HumanMessage(content=prompt)], stage="classification")
     return response.content.strip()
 
 
+def parse_published(value) -> datetime:
+    """Parse a NewsAPI publishedAt timestamp, falling back to now"""
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
 class NewsScraper:
     def __init__(self):
-        self.session = SessionLocal()
+        # Scrapes run one at a time (startup, /news/scrape/), each with its own Session
+        self.lock = threading.Lock()
+        self.session = None
 
+    @timed("scrape")
     def scrape_and_store(self):
         """
-        Scrape news from NewsAPI and store in DB with category and embedding.
+        Fetch new items from every configured source concurrently and
+        store them in DB with category and embedding.
         """
+        with self.lock:
+            self.session = SessionLocal()
+            try:
+                return self._scrape_and_store()
+            finally:
+                self.session.close()
+                self.session = None
+
+    def _scrape_and_store(self):
         try:
-            url = f'https://newsapi.org/v2/top-headlines?language=en&pageSize=50&apiKey={Config.NEWS_API_KEY}'
-            response = requests.get(url).json()
+            # Make sure this month's partition exists and old data is retired
+            with timed("partitions"):
+                maintain_partitions()
+
+            sources = build_sources()
+            states = load_states(self.session, [s.name for s in sources])
+            with timed("fetch"):
+                results = fetch_all(sources, states)
+            failed = [(source.name, error) for source, _, _, error in results if error]
+            if sources and len(failed) == len(sources):
+                raise RuntimeError("; ".join(f"{name}: {error}" for name, error in failed))
             new_count = 0
+            duplicate_count = 0
+            model_name = active_model_name(fresh=True)
 
-            for article in response.get('articles', []):
+            articles = [a for _, items, _, _ in results for a in items]
+            known = set(self.session.execute(
+                select(NewsDocument.url).where(NewsDocument.url.in_([a.get('url') for a in articles if a.get('url')]))
+            ).scalars())
+
+            # Monthly partitions for every incoming month, so nothing strands in the default partition.
+            # The DDL runs in its own short transaction; this session's reads are ended first so it
+            # neither waits on them nor holds its lock through the embed and classify loop.
+            self.session.commit()
+            with timed("partitions"), engine.begin() as conn:
+                ensure_partitions_for(conn, [
+                    parse_published(a.get('publishedAt')) for a in articles
+                    if a.get('title') and a.get('url') and a.get('url') not in known
+                ])
+
+            for article in articles:
                 title = article.get('title', '')
                 desc = article.get('description', '')
                 link = article.get('url', '')
+                published = parse_published(article.get('publishedAt'))
 
                 if not title or not link:
                     continue
 
                 # Skip if already exists
-                if self.session.query(NewsDocument).filter_by(url=link).first():
+                if link in known:
                     continue
+                known.add(link)
 
                 # Combine title and description for content
                 content = f"{title}. {desc}" if desc else title
 
+                # Skip or link syndicated copies before paying for embedding and classification
+                signature = article_signature(title, desc)
+                with timed("dedup"):
+                    canonical_id = find_near_duplicate(self.session, signature, Config.NEAR_DUP_MAX_DISTANCE)
+                if canonical_id is not None:
+                    duplicate_count += 1
+                    NEAR_DUPLICATES.inc(policy=Config.NEAR_DUP_POLICY)
+                    if Config.NEAR_DUP_POLICY == "link":
+                        self.session.add(NewsDocument(
+                            title=title,
+                            content=content,
+                            url=link,
+                            published_date=published,
+                            duplicate_of=canonical_id,
+                            **signature_columns(signature)
+                        ))
+                    continue
+
                 # ✅ Generate embedding
-                embedding = embedding_model.encode(content).tolist()
+                with timed("embed"):
+                    embedding = get_embedding_model(model_name).encode(content).tolist()
 
                 # ✅ Detect category dynamically using Mistral
                 category = classify_category_with_mistral(content)
 
+                # ✅ Join the story cluster covering the same event
+                with timed("cluster"):
+                    cluster = assign_cluster(self.session, embedding)
+
                 # ✅ Save to DB
                 self.session.add(NewsDocument(
                     title=title,
                     content=content,
                     url=link,
+                    published_date=published,
                     category=category,
-                    embedding=embedding
+                    cluster_id=cluster.id,
+                    **embedding_columns(embedding, model_name),
+                    **signature_columns(signature)
                 ))
                 new_count += 1
 
-            self.session.commit()
-            return f"✅ {new_count} new articles stored successfully"
+            # Cursors advance in the same transaction as the articles they cover
+            for source, _, state, error in results:
+                save_state(self.session, source.name, state, f"error: {error}" if error else "ok")
+
+            # Gradually cluster articles stored before clustering existed
+            with timed("cluster"):
+                assign_unclustered(self.session)
+
+            with timed("db_commit"):
+                self.session.commit()
+            if new_count:
+                invalidate_corpus_version()
+
+            # Digest long new articles (and a few older ones) in batched LLM calls, off the request path
+            if Config.ARTICLE_DIGESTS and new_count:
+                digest_in_background(new_count + Config.DIGEST_BACKFILL_LIMIT)
+
+            # Rebuild the browse views over the new articles
+            if new_count:
+                try:
+                    browse_views.refresh()
+                except Exception as e:
+                    print(f"❌ Browse refresh failed: {e}")
+            message = f"✅ {new_count} new articles stored successfully"
+            if duplicate_count:
+                action = "linked" if Config.NEAR_DUP_POLICY == "link" else "skipped"
+                message += f" ({duplicate_count} near-duplicates {action})"
+            if failed:
+                message += f" ({len(failed)} of {len(sources)} sources failed: {', '.join(n for n, _ in failed)})"
+            return message
 
         except Exception as e:
             self.session.rollback()
             return f"❌ Error during scraping: {str(e)}"
-
-        finally:
-            self.session.close()
@@ -1,38 +1,83 @@
 import os
 import re
+import secrets
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
-from langchain_mistralai.chat_models import ChatMistralAI
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 from app.models.base import SessionLocal
 from app.models.news_document import NewsDocument
+from app.models.story_cluster import StoryCluster
 from dotenv import load_dotenv
 from config import Config
-from sqlalchemy import select, func
-from langchain.schema import HumanMessage
-from langchain_groq.chat_models import ChatGroq
-from sqlalchemy import select
-from .news_scraper import classify_category_with_mistral
+from sqlalchemy import select, func, text, values, column, cast, true, or_, Integer
+from sqlalchemy.orm import aliased
+from langchain_core.messages import HumanMessage
+from .news_scraper import classify_category_with_mistral, corpus_version
+from .singleflight import SingleFlight
+from .quantization import binary_quantize, prefilter_ready
+from .reembed import active_model_name
+from .digests import digests_for_urls
+from .clients import invoke_llm, limiters, ProviderBusyError
+from .metrics import timed, register_collector
+from .factories import get_embedding_model, get_groq_llm
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+# "🔗 **URL:** https://..." lines in rendered search results
+URL_LINE = re.compile(r'🔗 \*{0,2}URL:\*{0,2}\s*(\S+)')
+# Start of each rendered article, and the "📜 **Content:**" line opening its body
+ARTICLE_START = re.compile(r'^(?=📰)', re.MULTILINE)
+BODY_LINE = re.compile(r'^📜[^\n]*\n', re.MULTILINE)
+SEPARATOR = "\n" + "-" * 60
+
+
+class SearchHit(NamedTuple):
+    """One search candidate: the article columns search needs, never its vectors"""
+    id: int
+    title: str
+    url: str
+    category: Optional[str]
+    content: str
+    digest: Optional[str]
+    distance: float
+
+
+# Selected in SearchHit field order, followed by the distance
+HIT_COLUMNS = (
+    NewsDocument.id, NewsDocument.title, NewsDocument.url,
+    NewsDocument.category, NewsDocument.content, NewsDocument.digest,
+)
+
+# Shared by all NewsTools instances so concurrent identical searches coalesce
+search_flight = SingleFlight()
+
+
+@register_collector
+def _search_flight_metrics():
+    return [
+        ("news_search_executions_total", "counter", "Search pipeline executions",
+         [({}, search_flight.stats["executions"])]),
+        ("news_search_coalesced_total", "counter", "Searches served by an in-flight execution",
+         [({}, search_flight.stats["coalesced"])]),
+        ("news_search_in_flight", "gauge", "Search pipelines currently running",
+         [({}, search_flight.in_flight())]),
+    ]
 
 load_dotenv()
 
+
+def report_filename() -> str:
+    """A new report name: creation time plus a random token, so names cannot be guessed"""
+    return f"news_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(8)}.pdf"
+
+
 class NewsTools:
-    def __init__(self):
-        if not Config.GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY is missing")
-
-        self.llm = ChatGroq(
-            api_key=Config.GROQ_API_KEY,
-            model_name="llama3-70b-8192",
-            temperature=0.2
-        )
-        self.session = SessionLocal()
+    @property
+    def llm(self):
+        return get_groq_llm()
 
     def normalize_category(self, category: str) -> str:
         """
@@ -44,13 +89,13 @@ class NewsTools:
         category = re.sub(r'\(.*?\)', '', category)
         return category.strip()
 
-    def filter_relevant_batch(self, articles: list, user_query: str) -> list:
+    def filter_relevant_batch(self, articles: list, user_query: str, reservation=None) -> list:
         """
         Batch relevance filtering using LLM.
         Returns indices of relevant articles.
         """
         formatted_articles = "\n".join(
-            [f"{i+1}. Title: {a['title']}\nContent: {a['content'][:300]}..." for i, a in enumerate(articles)]
+            [f"{i+1}. Title: {a.title}\nContent: {(a.content or '')[:300]}..." for i, a in enumerate(articles)]
         )
 
         prompt = (
@@ -60,71 +105,211 @@ class NewsTools:
             "Return only a comma-separated list of numbers (e.g., 1,3,5)."
         )
 
-        response = self.llm.invoke(prompt).content.strip()
+        response = invoke_llm(
+            "groq", self.llm, prompt, stage="relevance_llm", reservation=reservation
+        ).content.strip()
         relevant_indices = [int(i)-1 for i in response.split(",") if i.strip().isdigit()]
         return relevant_indices
 
-    def search_news(self, query: str) -> str:
+    def normalize_query(self, query: str) -> str:
+        """
+        Normalize a query for request coalescing.
+        """
+        return " ".join(re.findall(r"\w+", query.lower()))
+
+    def search_news(self, query: str, days: int = None) -> str:
+        """
+        Search news, sharing one pipeline execution between concurrent
+        identical queries against the same live model and corpus version;
+        each caller's reply is rendered with its own query.
+        `days` limits the search to recent articles (default SEARCH_WINDOW_DAYS).
+        """
+        days = days if days is not None else Config.SEARCH_WINDOW_DAYS
+        key = (self.normalize_query(query), days, active_model_name(), corpus_version())
+        with timed("search"):
+            result = search_flight.do(key, self._search_news, query, days)
+        return self.render_results(result, query)
+
+    def fetch_candidates(self, session, query_embedding, mode: str = None, days: int = None,
+                         prefilter: bool = None, model_name: str = None) -> list:
+        """
+        Fetch SearchHit candidates for a query embedding, nearest first.
+        'articles' ranks every canonical article; 'clusters' ranks story
+        centroids first and expands each of the closest clusters to its
+        best-matching members. A `days` window lets PostgreSQL prune
+        old partitions. With `prefilter` (default BINARY_PREFILTER),
+        articles are shortlisted by Hamming distance on the sign bits
+        and reranked by cosine distance on the stored vectors. Only vectors
+        from `model_name` (default: the active model) are compared.
+        """
+        mode = mode or Config.SEARCH_MODE
+        prefilter = Config.BINARY_PREFILTER if prefilter is None else prefilter
+        model_name = model_name or active_model_name()
+        distance = NewsDocument.embedding.cosine_distance(query_embedding)
+        filters = [
+            NewsDocument.duplicate_of.is_(None), NewsDocument.embedding.isnot(None),
+            or_(NewsDocument.embedding_model == model_name, NewsDocument.embedding_model.is_(None))
+        ]
+        if days:
+            filters.append(NewsDocument.published_date >= datetime.utcnow() - timedelta(days=days))
+
+        if mode != "clusters" and prefilter and prefilter_ready(session.connection()):
+            if session.get_bind().dialect.name == "postgresql":
+                # The HNSW scan returns at most ef_search rows
+                session.execute(text(f"SET LOCAL hnsw.ef_search = {min(1000, Config.PREFILTER_CANDIDATES)}"))
+            shortlist = (
+                select(NewsDocument.id)
+                .where(*filters, NewsDocument.embedding_bits.isnot(None))
+                .order_by(NewsDocument.embedding_bits.hamming_distance(binary_quantize(query_embedding)))
+                .limit(Config.PREFILTER_CANDIDATES)
+                .cte("shortlist")
+            )
+            stmt = (
+                select(*HIT_COLUMNS, distance.label("distance"))
+                .join(shortlist, NewsDocument.id == shortlist.c.id)
+                .order_by("distance")
+                .limit(30)
+            )
+            return [SearchHit(*row) for row in session.execute(stmt)]
+
+        if mode != "clusters":
+            stmt = (
+                select(*HIT_COLUMNS, distance.label("distance"))
+                .where(*filters)
+                .order_by("distance")
+                .limit(30)
+            )
+            return [SearchHit(*row) for row in session.execute(stmt)]
+
+        clusters = (
+            select(StoryCluster.id)
+            .order_by(StoryCluster.centroid.cosine_distance(query_embedding))
+            .limit(Config.SEARCH_CLUSTERS)
+            .cte("nearest_clusters")
+        )
+        members = (
+            select(
+                NewsDocument.id,
+                distance.label("distance"),
+                func.row_number().over(partition_by=NewsDocument.cluster_id, order_by=distance).label("member_rank")
+            )
+            .join(clusters, NewsDocument.cluster_id == clusters.c.id)
+            .where(*filters)
+            .subquery()
+        )
+        stmt = (
+            select(*HIT_COLUMNS, members.c.distance)
+            .join(members, NewsDocument.id == members.c.id)
+            .where(members.c.member_rank <= Config.SEARCH_MEMBERS_PER_CLUSTER)
+            .order_by(members.c.distance)
+        )
+        return [SearchHit(*row) for row in session.execute(stmt)]
+
+    def fetch_candidates_batch(self, session, query_embeddings: list, days: int = None,
+                               model_name: str = None) -> list:
+        """
+        Candidates for many query embeddings, one list per embedding. On
+        PostgreSQL 'articles' search runs as a single LATERAL join over
+        the batch; other modes and databases fall back to one query each.
+        """
+        if (session.get_bind().dialect.name != "postgresql" or Config.SEARCH_MODE == "clusters"
+                or Config.BINARY_PREFILTER or not query_embeddings):
+            return [self.fetch_candidates(session, e, days=days, model_name=model_name) for e in query_embeddings]
+
+        embedding_type = NewsDocument.embedding.type
+        queries = values(
+            column("idx", Integer), column("embedding", embedding_type), name="queries"
+        ).data(list(enumerate(query_embeddings)))
+        # Aliased so the lateral subquery correlates with `queries` only
+        docs = aliased(NewsDocument)
+        model_name = model_name or active_model_name()
+        filters = [
+            docs.duplicate_of.is_(None), docs.embedding.isnot(None),
+            or_(docs.embedding_model == model_name, docs.embedding_model.is_(None))
+        ]
+        if days:
+            filters.append(docs.published_date >= datetime.utcnow() - timedelta(days=days))
+        distance = docs.embedding.cosine_distance(cast(queries.c.embedding, embedding_type))
+        hits = (
+            select(docs.id, distance.label("distance"))
+            .where(*filters)
+            .order_by("distance")
+            .limit(30)
+            .lateral("hits")
+        )
+        stmt = (
+            select(queries.c.idx, *HIT_COLUMNS, hits.c.distance)
+            .select_from(queries)
+            .join(hits, true())
+            .join(NewsDocument, NewsDocument.id == hits.c.id)
+            .order_by(queries.c.idx, hits.c.distance)
+        )
+        results = [[] for _ in query_embeddings]
+        for idx, *row in session.execute(stmt):
+            results[idx].append(SearchHit(*row))
+        return results
+
+    def _search_news(self, query: str, days: int = None) -> dict:
         """
         Advanced news search with:
         - Vector similarity search.
         - Batch LLM relevance filtering.
         - Hybrid ranking (vector + keywords).
         - Summarized response.
+        Returns a result dict for render_results.
         """
+        session = SessionLocal()
         try:
             # ✅ Step 1: Generate query embedding
-            query_embedding = embedding_model.encode(query).tolist()
+            model_name = active_model_name()
+            with timed("embed"):
+                query_embedding = get_embedding_model(model_name).encode(query).tolist()
 
-            # ✅ Step 2: Fetch top 30 similar articles from DB
-            stmt = (
-                select(
-                    NewsDocument,
-                    NewsDocument.embedding.cosine_distance(query_embedding).label("distance")
-                )
-                .order_by("distance")
-                .limit(30)
-            )
-            rows = self.session.execute(stmt).all()
-            if not rows:
-                return f"❗ No news found for '{query}'."
+            # ✅ Step 2: Fetch candidate articles from DB
+            with timed("vector_query"):
+                rows = self.fetch_candidates(session, query_embedding, days=days, model_name=model_name)
+            return self.answer_from_candidates(query, rows)
 
-            # ✅ Step 3: Prepare for batch relevance filtering
-            articles = [{"title": doc.title, "content": doc.content, "doc": doc} for doc, _ in rows]
+        except ProviderBusyError:
+            raise
+        except Exception as e:
+            return {"message": f"❌ Error during news search: {str(e)}"}
+        finally:
+            session.close()
 
-            relevant_indices = self.filter_relevant_batch(articles, query)
-            if not relevant_indices:
-                return f"❗ No relevant news found for '{query}'."
+    def answer_from_candidates(self, query: str, hits: list, reservation=None) -> dict:
+        """
+        Relevance filtering, hybrid ranking and summary over the SearchHit
+        candidates of one query. Returns {"summary", "articles"} with the
+        top SearchHits, {"empty"} when nothing matched, or {"message"} on
+        error. None of them quote the query, so coalesced callers can share it.
+        The two LLM calls use `reservation` tokens when given.
+        """
+        try:
+            if not hits:
+                return {"empty": "No news found"}
 
-            # ✅ Step 4: Select relevant docs
-            relevant_news = [(articles[i]["doc"], rows[i][1]) for i in relevant_indices]
+            # ✅ Step 3: Batch relevance filtering
+            relevant_indices = self.filter_relevant_batch(hits, query, reservation)
+            relevant = [hits[i] for i in dict.fromkeys(relevant_indices) if 0 <= i < len(hits)]
+            if not relevant:
+                return {"empty": "No relevant news found"}
 
-            # ✅ Step 5: Hybrid ranking (vector + keyword boost)
+            # ✅ Step 4: Hybrid ranking (vector + keyword boost)
             keywords = query.lower().split()
             ranked = []
-            for doc, dist in relevant_news:
-                similarity_score = 1 - dist
-                keyword_hits = sum(k in (doc.title.lower() + doc.content.lower()) for k in keywords)
-                final_score = similarity_score + (0.05 * keyword_hits)
-                ranked.append((doc, final_score))
-
-            ranked.sort(key=lambda x: x[1], reverse=True)
-            top_results = ranked[:5]
-
-            # ✅ Step 6: Prepare context for summarization
-            news_chunks = []
-            for doc, _ in top_results:
-                normalized_category = self.normalize_category(doc.category)
-                news_chunks.append(
-                    f"📰 **Title:** {doc.title}\n"
-                    f"🔗 **URL:** {doc.url}\n"
-                    f"📂 **Category:** {normalized_category}\n"
-                    f"📜 **Content:**\n{doc.content}\n"
-                    + "-" * 60
-                )
-            context_text = "\n\n".join(news_chunks)
+            for hit in relevant:
+                text_lower = f"{hit.title or ''}\n{hit.content or ''}".lower()
+                keyword_hits = sum(k in text_lower for k in keywords)
+                ranked.append((1 - hit.distance + 0.05 * keyword_hits, hit))
+            ranked.sort(key=lambda x: x[0], reverse=True)
+            top_results = [hit for _, hit in ranked[:5]]
 
-            # ✅ Step 7: LLM summarization
+            # ✅ Step 5: LLM summarization over the ingest-time digests (full content where none exists yet)
+            digest_text = "\n\n".join(
+                f"📰 **Title:** {hit.title}\n🔗 **URL:** {hit.url}\n📜 **Digest:**\n{hit.digest or hit.content}"
+                for hit in top_results
+            )
             prompt = (
                 "You are an expert news assistant. Based on the following relevant news articles, "
                 "answer the user's query:\n"
@@ -132,17 +317,85 @@ class NewsTools:
                 "Provide:\n"
                 "1. A short direct answer.\n"
                 "2. A concise summary of the main points.\n\n"
-                f"Articles:\n{context_text}\n\nAnswer:"
+                f"Articles:\n{digest_text}\n\nAnswer:"
             )
-            summary = self.llm.invoke(prompt).content
+            summary = invoke_llm("groq", self.llm, prompt, stage="summary_llm", reservation=reservation).content
+            return {"summary": summary, "articles": top_results}
 
-            return f"🤖 {summary}\n\n📌 Top Relevant News:\n{context_text}"
+        except ProviderBusyError:
+            raise
+        except Exception as e:
+            return {"message": f"❌ Error during news search: {str(e)}"}
+
+    def render_results(self, result: dict, query: str) -> str:
+        """Format a search result dict as the chat reply to `query`"""
+        if "message" in result:
+            return result["message"]
+        if "empty" in result:
+            return f"❗ {result['empty']} for '{query}'."
+        news_chunks = [
+            f"📰 **Title:** {hit.title}\n"
+            f"🔗 **URL:** {hit.url}\n"
+            f"📂 **Category:** {self.normalize_category(hit.category)}\n"
+            f"📜 **Content:**\n{hit.content}\n"
+            + "-" * 60
+            for hit in result["articles"]
+        ]
+        return f"🤖 {result['summary']}\n\n📌 Top Relevant News:\n" + "\n\n".join(news_chunks)
+
+    def search_news_batch(self, queries: list, days: int = None) -> tuple:
+        """
+        Answer many queries at once: one embedding batch, one candidate
+        query for the whole batch and bounded-concurrency LLM calls.
+        The batch reserves its Groq calls in one go, up to BATCH_RESERVE_SHARE
+        of what the limiter can grant within its queue timeout, so live
+        chat keeps the rest; queries beyond that are shed up front instead
+        of queueing. Returns (responses in the order of `queries`,
+        number of shed responses); identical queries are answered once.
+        """
+        if not queries:
+            return [], 0
+        days = days if days is not None else Config.SEARCH_WINDOW_DAYS
+        unique = list(dict.fromkeys(self.normalize_query(q) for q in queries))
+        first = {}
+        for query in queries:
+            first.setdefault(self.normalize_query(query), query)
+
+        session = SessionLocal()
+        try:
+            model_name = active_model_name()
+            with timed("embed"):
+                embeddings = get_embedding_model(model_name).encode([first[key] for key in unique]).tolist()
+            with timed("vector_query"):
+                candidates = self.fetch_candidates_batch(session, embeddings, days=days, model_name=model_name)
+
+            # Relevance and summary: two Groq calls per query with candidates
+            needs_llm = [i for i in range(len(unique)) if candidates[i]]
+            reservation = limiters["groq"].reserve(2 * len(needs_llm), Config.BATCH_RESERVE_SHARE)
+            admitted = set(needs_llm[:reservation.granted // 2])
+            shed = set()
+
+            def answer(i):
+                try:
+                    if candidates[i] and i not in admitted:
+                        raise ProviderBusyError("groq", Config.PROVIDER_QUEUE_TIMEOUT)
+                    return self.answer_from_candidates(first[unique[i]], candidates[i], reservation)
+                except ProviderBusyError as e:
+                    shed.add(unique[i])
+                    return {"message": f"❌ Service busy: {str(e)}"}
 
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, min(len(unique), Config.BATCH_CONCURRENCY))) as pool:
+                    answers = dict(zip(unique, pool.map(answer, range(len(unique)))))
+            finally:
+                reservation.release()
         except Exception as e:
-            return f"❌ Error during news search: {str(e)}"
+            return [f"❌ Error during news search: {str(e)}"] * len(queries), 0
         finally:
-            self.session.close()
-
+            session.close()
+        # Identical queries share a result, but each reply quotes its own wording
+        keys = [self.normalize_query(q) for q in queries]
+        return [self.render_results(answers[key], q) for q, key in zip(queries, keys)], sum(key in shed for key in keys)
 
     def translate_text(self, text, language="Hindi"):
         try:
@@ -162,8 +415,9 @@ class NewsTools:
             )
             
             # Get translation from Groq with specific parameters for Hindi
-            response = self.llm.invoke(
-                prompt,
+            response = invoke_llm(
+                "groq", self.llm, prompt,
+                stage="translate_llm",
                 temperature=0.2,  # Lower temperature for more precise translations
                 max_tokens=4000,   # Ensure enough tokens for complete translation
                 stop=["###"]       # Stop sequence to prevent runaway generation
@@ -188,11 +442,43 @@ class NewsTools:
             
             return translated
             
+        except ProviderBusyError:
+            raise
         except Exception as e:
             return f"❌ Translation Error: {str(e)}"
 
+    def with_digests(self, text: str) -> str:
+        """
+        Swap each rendered article body for its stored digest. Title, date
+        and URL lines stay; bodies that differ from the stored content
+        (translated or edited) are kept as they are.
+        """
+        urls = list(dict.fromkeys(URL_LINE.findall(text or "")))
+        if not urls:
+            return text
+        session = SessionLocal()
+        try:
+            digests = digests_for_urls(session, urls)
+        finally:
+            session.close()
+        if not digests:
+            return text
+
+        blocks = []
+        for block in ARTICLE_START.split(text):
+            url, body = URL_LINE.search(block), BODY_LINE.search(block)
+            if url and body and url.group(1) in digests:
+                content, digest = digests[url.group(1)]
+                original, separator, tail = block[body.end():].partition(SEPARATOR)
+                if original.strip() == (content or "").strip():
+                    block = block[:body.end()] + digest + separator + tail
+            blocks.append(block)
+        return "".join(blocks)
+
     def summarize_news(self, text):
         try:
+            # Articles stored with a digest are summarized from it instead of their full text
+            text = self.with_digests(text)
             prompt = (
                 "Summarize the key points from these news articles. "
                 "Keep the original article structure but make each summary concise. "
@@ -204,7 +490,9 @@ class NewsTools:
                 "Original articles:\n"
                 f"{text}"
             )
-            return self.llm.invoke(prompt).content
+            return invoke_llm("groq", self.llm, prompt, stage="summarize_llm").content
+        except ProviderBusyError:
+            raise
         except Exception as e:
             return f"❌ Error: {e}"
 
@@ -229,8 +517,7 @@ class NewsTools:
                 from reportlab.pdfbase.ttfonts import TTFont
                 
                 # Generate unique filename
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"news_report_{timestamp}.pdf"
+                filename = report_filename()
                 
                 # Create PDF document
                 doc = SimpleDocTemplate(filename, pagesize=A4,
@@ -287,7 +574,8 @@ class NewsTools:
                         story.append(Spacer(1, 6))
                 
                 # Build PDF
-                doc.build(story)
+                with timed("pdf_render"):
+                    doc.build(story)
                 
                 # Verify file was created
                 if os.path.exists(filename) and os.path.getsize(filename) > 0:
@@ -363,9 +651,9 @@ class NewsTools:
                     pdf.ln(4)
             
             # Generate filename and save
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"news_report_{timestamp}.pdf"
-            pdf.output(filename)
+            filename = report_filename()
+            with timed("pdf_render"):
+                pdf.output(filename)
             
             if os.path.exists(filename) and os.path.getsize(filename) > 0:
                 return f"📄 PDF created successfully: {filename}"
@@ -404,12 +692,13 @@ class NewsTools:
                 msg.attach(part)
             
             # Send email
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(Config.EMAIL_USER, Config.EMAIL_PASS)
-            text = msg.as_string()
-            server.sendmail(Config.EMAIL_USER, email, text)
-            server.quit()
+            with timed("smtp"):
+                server = smtplib.SMTP('smtp.gmail.com', 587, timeout=Config.HTTP_TIMEOUT)
+                server.starttls()
+                server.login(Config.EMAIL_USER, Config.EMAIL_PASS)
+                text = msg.as_string()
+                server.sendmail(Config.EMAIL_USER, email, text)
+                server.quit()
             
             # Clean up - remove PDF after sending
             try:
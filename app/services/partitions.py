@@ -0,0 +1,262 @@
+"""
+Monthly partitions and retention for news_documents.
+
+    python -m app.services.partitions maintain   # premake partitions, apply retention
+    python -m app.services.partitions migrate    # convert an existing table (NEWS_PARTITIONING=true)
+"""
+import re
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import text, select, update, delete, exists
+from config import Config
+from app.models.base import engine, upgrade_tables
+from app.models.news_document import NewsDocument, PARTITIONED
+from app.models.story_cluster import StoryCluster
+
+TABLE = NewsDocument.__tablename__
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{TABLE}_p{start:%Y_%m}"
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"), {"name": TABLE}).scalar()
+    return relkind == 'p'
+
+
+def list_partitions(conn) -> dict:
+    """Monthly partitions currently attached, keyed by month start"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_vector_index(conn, table: str):
+    """HNSW index per partition, so each index stays small and drops with its partition"""
+    ops = "halfvec_cosine_ops" if Config.EMBEDDING_STORAGE == "halfvec" else "vector_cosine_ops"
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {table}_embedding_hnsw ON {table} USING hnsw (embedding {ops})"
+    ))
+    if Config.BINARY_PREFILTER:
+        create_prefilter_index(conn, table)
+
+
+def create_prefilter_index(conn, table: str):
+    """HNSW index for the Hamming prefilter; without it the prefilter would scan every row"""
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {table}_embedding_bits_hnsw ON {table} USING hnsw (embedding_bits bit_hamming_ops)"
+    ))
+
+
+def ensure_default_partition(conn):
+    """Catch-all for rows outside any monthly partition"""
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+    create_vector_index(conn, f"{TABLE}_default")
+
+
+def ensure_partitions(conn, start: datetime, end: datetime) -> list:
+    """Create the monthly partitions covering [start, end]"""
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = add_months(month, 1)
+    return create_month_partitions(conn, months)
+
+
+def create_month_partitions(conn, months) -> list:
+    """
+    Create the partitions for these month starts. Rows already in the
+    default partition for a new month are moved into it, since
+    PostgreSQL refuses a partition whose range the default still holds.
+    """
+    existing = list_partitions(conn)
+    has_default = conn.execute(text("SELECT to_regclass(:t)"), {"t": f"{TABLE}_default"}).scalar()
+    columns = ", ".join(c.name for c in NewsDocument.__table__.columns)
+    created = []
+    for month in sorted(months):
+        if month not in existing:
+            name = partition_name(month)
+            bounds = {"start": month, "end": add_months(month, 1)}
+            in_range = "published_date >= :start AND published_date < :end"
+            stranded = has_default and conn.execute(
+                text(f"SELECT EXISTS (SELECT 1 FROM {TABLE}_default WHERE {in_range})"), bounds
+            ).scalar()
+            if stranded:
+                conn.execute(text(
+                    f"CREATE TEMP TABLE {name}_moving AS SELECT {columns} FROM {TABLE}_default WHERE {in_range}"
+                ), bounds)
+                conn.execute(text(f"DELETE FROM {TABLE}_default WHERE {in_range}"), bounds)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            if stranded:
+                conn.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {name}_moving"))
+                conn.execute(text(f"DROP TABLE {name}_moving"))
+            create_vector_index(conn, name)
+            created.append(name)
+    return created
+
+
+def ensure_partitions_for(conn, dates: list, now: datetime = None) -> list:
+    """
+    Partitions for the months these published dates fall in, and only
+    those, so one stray backdated item costs one partition. Months
+    already past retention are left to the default partition, which
+    apply_retention purges.
+    """
+    if not dates or not is_partitioned(conn):
+        return []
+    months = {month_start(d) for d in dates}
+    if Config.NEWS_RETENTION_DAYS > 0:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=Config.NEWS_RETENTION_DAYS)
+        months = {m for m in months if add_months(m, 1) > cutoff}
+    return create_month_partitions(conn, months)
+
+
+def apply_retention(conn, now: datetime = None) -> list:
+    """
+    Remove data older than NEWS_RETENTION_DAYS. Partitioned tables detach
+    (archive) or drop whole partitions; plain tables delete in batches.
+    """
+    if Config.NEWS_RETENTION_DAYS <= 0:
+        return []
+    cutoff = (now or datetime.utcnow()) - timedelta(days=Config.NEWS_RETENTION_DAYS)
+
+    if is_partitioned(conn):
+        removed = []
+        for start, name in sorted(list_partitions(conn).items()):
+            if add_months(start, 1) > cutoff:
+                break
+            # Duplicates linked to an article leaving the table become canonical themselves
+            conn.execute(text(
+                f"UPDATE {TABLE} SET duplicate_of = NULL WHERE duplicate_of IN (SELECT id FROM {name})"
+            ))
+            if Config.NEWS_RETENTION_MODE == "drop":
+                conn.execute(text(f"DROP TABLE {name}"))
+            else:
+                archive = f"news_archive_{start:%Y_%m}"
+                conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                if conn.execute(text("SELECT to_regclass(:t)"), {"t": archive}).scalar():
+                    conn.execute(text(f"INSERT INTO {archive} SELECT * FROM {name}"))
+                    conn.execute(text(f"DROP TABLE {name}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {name} RENAME TO {archive}"))
+                    # Archived tables must not keep the parent's id sequence alive
+                    conn.execute(text(f"ALTER TABLE {archive} ALTER COLUMN id DROP DEFAULT"))
+            removed.append(name)
+        # Expired rows that never had a monthly partition
+        default = f"{TABLE}_default"
+        if conn.execute(text("SELECT to_regclass(:t)"), {"t": default}).scalar():
+            conn.execute(text(
+                f"UPDATE {TABLE} SET duplicate_of = NULL "
+                f"WHERE duplicate_of IN (SELECT id FROM {default} WHERE published_date < :cutoff)"
+            ), {"cutoff": cutoff})
+            deleted = conn.execute(text(f"DELETE FROM {default} WHERE published_date < :cutoff"), {"cutoff": cutoff}).rowcount
+            if deleted:
+                removed.append(f"{deleted} rows from {default}")
+    else:
+        removed = _delete_older_than(conn, cutoff)
+
+    # Clusters with no remaining members
+    conn.execute(delete(StoryCluster).where(
+        StoryCluster.updated_at < cutoff,
+        ~exists().where(NewsDocument.cluster_id == StoryCluster.id)
+    ))
+    return removed
+
+
+def _delete_older_than(conn, cutoff: datetime, batch_size: int = 5000) -> list:
+    deleted = 0
+    while True:
+        ids = conn.execute(
+            select(NewsDocument.id).where(NewsDocument.published_date < cutoff).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        conn.execute(update(NewsDocument).where(NewsDocument.duplicate_of.in_(ids)).values(duplicate_of=None))
+        conn.execute(delete(NewsDocument).where(NewsDocument.id.in_(ids)))
+        deleted += len(ids)
+    return [f"{deleted} rows"] if deleted else []
+
+
+def maintain_partitions(now: datetime = None) -> dict:
+    """Premake upcoming partitions and apply the retention policy"""
+    now = now or datetime.utcnow()
+    with engine.begin() as conn:
+        created = []
+        if is_partitioned(conn):
+            ensure_default_partition(conn)
+            created = ensure_partitions(conn, now, add_months(month_start(now), Config.PARTITION_PREMAKE_MONTHS))
+        elif Config.BINARY_PREFILTER and conn.dialect.name == "postgresql":
+            try:
+                with conn.begin_nested():
+                    create_prefilter_index(conn, TABLE)
+            except Exception as e:
+                # e.g. pgvector < 0.7; search skips the prefilter while the index is missing
+                print(f"❗ Prefilter index not created: {e}")
+        removed = apply_retention(conn, now)
+    return {"created": created, "removed": removed}
+
+
+def migrate_to_partitioned() -> str:
+    """Copy an existing plain news_documents table into a partitioned one"""
+    if not PARTITIONED:
+        return "❗ Set NEWS_PARTITIONING=true with a PostgreSQL DATABASE_URL first."
+
+    legacy = f"{TABLE}_unpartitioned"
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return "✅ news_documents is already partitioned"
+
+        # Bring the old table up to the current columns, then move it and its indexes out of the way
+        upgrade_tables(conn)
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+        for index in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": legacy}).scalars():
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+
+        NewsDocument.__table__.create(conn)
+        ensure_default_partition(conn)
+        oldest, newest = conn.execute(text(f"SELECT min(published_date), max(published_date) FROM {legacy}")).one()
+        now = datetime.utcnow()
+        ensure_partitions(conn, oldest or now, add_months(month_start(max(newest or now, now)), Config.PARTITION_PREMAKE_MONTHS))
+
+        names = [c.name for c in NewsDocument.__table__.columns]
+        values = ", ".join("COALESCE(published_date, now())" if n == "published_date" else n for n in names)
+        moved = conn.execute(text(
+            f"INSERT INTO {TABLE} ({', '.join(names)}) SELECT {values} FROM {legacy}"
+        )).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT max(id) FROM {TABLE}), 1))"
+        ))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+    return f"✅ {moved} articles moved into the partitioned table"
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "maintain"
+    if command == "migrate":
+        print(migrate_to_partitioned())
+    print(maintain_partitions())
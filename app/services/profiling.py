@@ -0,0 +1,166 @@
+"""
+Opt-in request profiling. With PROFILE_ENABLED and ADMIN_TOKEN set, a
+chat request is profiled when it sends ADMIN_TOKEN in PROFILE_HEADER, or
+when sampled at PROFILE_SAMPLE_RATE. The cProfile trace of
+process_message, with timings for every graph node including those
+LangGraph ran on worker threads, is kept in memory for /admin/profiles/
+(also ADMIN_TOKEN only). Only one profiler may be active per process
+(Python 3.12+ refuses a second), so one request is profiled at a time
+and overlapping ones run unprofiled. Unprofiled requests only pay for
+one context variable lookup per node.
+"""
+import io
+import hmac
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import marshal
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+
+_current = contextvars.ContextVar("profile", default=None)
+# Held while a request is profiled; the process-wide profiler slot
+_active = threading.Lock()
+
+
+class Profile:
+    """One profiled call: its cProfile stats and the graph nodes that ran"""
+    def __init__(self, label: str, meta: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.meta = meta
+        self.started_at = datetime.utcnow()
+        self.thread = threading.get_ident()
+        self.nodes = []
+        self.seconds = None
+        self.stats = None
+        self.lock = threading.Lock()
+
+    def add_stats(self, profiler: cProfile.Profile):
+        with self.lock:
+            self.stats = pstats.Stats(profiler)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at.isoformat() + "Z",
+            "duration_ms": round(self.seconds * 1000, 2) if self.seconds is not None else None,
+            "nodes": [node["node"] for node in self.nodes],
+            **self.meta,
+        }
+
+    def report(self, sort: str = "cumulative", limit: int = 40) -> dict:
+        """Summary, per-node timings and the top functions as pstats text"""
+        out = io.StringIO()
+        if self.stats is not None:
+            with self.lock:
+                self.stats.stream = out
+                self.stats.sort_stats(sort).print_stats(limit)
+        return {**self.summary(), "node_timings": self.nodes, "stats": out.getvalue()}
+
+    def dump(self) -> bytes:
+        """Raw stats in the pstats file format (snakeviz, pstats.Stats)"""
+        with self.lock:
+            return marshal.dumps(self.stats.stats if self.stats is not None else {})
+
+
+class ProfileStore:
+    """The most recent PROFILE_STORE_SIZE profiles"""
+    def __init__(self, size: int = None):
+        self.size = size or Config.PROFILE_STORE_SIZE
+        self.profiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, profile: Profile):
+        with self.lock:
+            self.profiles[profile.id] = profile
+            while len(self.profiles) > self.size:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id: str):
+        with self.lock:
+            return self.profiles.get(profile_id)
+
+    def list(self) -> list:
+        with self.lock:
+            profiles = list(self.profiles.values())
+        return [p.summary() for p in reversed(profiles)]
+
+
+profiles = ProfileStore()
+
+
+def is_admin(token: str) -> bool:
+    """True when `token` matches ADMIN_TOKEN; always False while no token is configured"""
+    return bool(Config.ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, Config.ADMIN_TOKEN)
+
+
+def should_profile(header: str = None) -> bool:
+    """
+    Profile when PROFILE_ENABLED is set and the request sent PROFILE_HEADER
+    carrying ADMIN_TOKEN, or for a PROFILE_SAMPLE_RATE share of requests.
+    """
+    if header is not None and Config.PROFILE_ENABLED and is_admin(header):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def run_profiled(label: str, fn, *args, **meta):
+    """
+    Call fn(*args) under cProfile; returns (result, profile id). While
+    another request holds the profiler, fn runs unprofiled and the id is None.
+    """
+    if not _active.acquire(blocking=False):
+        return fn(*args), None
+    try:
+        return _run_profiled(label, fn, *args, **meta)
+    finally:
+        _active.release()
+
+
+def _run_profiled(label: str, fn, *args, **meta):
+    profile = Profile(label, meta)
+    profiler = cProfile.Profile()
+    token = _current.set(profile)
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            return fn(*args), profile.id
+        finally:
+            profiler.disable()
+    finally:
+        profile.seconds = time.perf_counter() - start
+        _current.reset(token)
+        profile.add_stats(profiler)
+        profiles.add(profile)
+
+
+@contextmanager
+def profiled_node(name: str):
+    """
+    Record a graph node's timing in the active profile. No extra profiler
+    is started for nodes on LangGraph's worker threads: a second active
+    profiler fails on Python 3.12+, so those nodes are timed only.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with profile.lock:
+            profile.nodes.append({
+                "node": name,
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+                "worker_thread": threading.get_ident() != profile.thread,
+            })
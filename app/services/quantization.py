@@ -0,0 +1,102 @@
+"""
+Compact embedding storage: half-precision vectors and binary-quantized
+sign bits for a Hamming-distance prefilter. Needs pgvector >= 0.7.
+
+    python -m app.services.quantization migrate   # convert embeddings to EMBEDDING_STORAGE, backfill embedding_bits
+"""
+import sys
+import time
+from sqlalchemy import text
+from config import Config
+from app.models.base import engine, upgrade_tables
+from .partitions import TABLE, is_partitioned, list_partitions, create_vector_index
+
+
+def binary_quantize(embedding) -> str:
+    """Sign bits of an embedding as a bit string, matching pgvector's binary_quantize()"""
+    return "".join("1" if value > 0 else "0" for value in embedding)
+
+
+def embedding_columns(embedding, model_name: str = None) -> dict:
+    """NewsDocument column values for a freshly computed embedding"""
+    columns = {"embedding": embedding, "embedding_model": model_name or Config.EMBEDDING_MODEL}
+    if Config.BINARY_PREFILTER:
+        columns["embedding_bits"] = binary_quantize(embedding)
+    return columns
+
+
+def vector_tables(conn) -> list:
+    """Tables holding vector indexes: every partition, or the plain table"""
+    if is_partitioned(conn):
+        default = f"{TABLE}_default"
+        has_default = conn.execute(text("SELECT to_regclass(:t)"), {"t": default}).scalar()
+        return [default] * bool(has_default) + list(list_partitions(conn).values())
+    return [TABLE]
+
+
+_prefilter_index = {"ready": None, "at": 0.0}
+
+
+def prefilter_ready(conn) -> bool:
+    """
+    Whether every vector table has its Hamming index, rechecked each
+    minute while missing. Other databases have no index to wait for.
+    """
+    if conn.dialect.name != "postgresql":
+        return True
+    now = time.monotonic()
+    if _prefilter_index["ready"] is None or (not _prefilter_index["ready"] and now - _prefilter_index["at"] > 60):
+        ready = all(
+            conn.execute(text("SELECT to_regclass(:i)"), {"i": f"{table}_embedding_bits_hnsw"}).scalar()
+            for table in vector_tables(conn)
+        )
+        if not ready:
+            print("❗ BINARY_PREFILTER is on but the embedding_bits index is missing; using exact search")
+        _prefilter_index.update(ready=ready, at=now)
+    return _prefilter_index["ready"]
+
+
+def migrate(batch_size: int = 5000) -> str:
+    """
+    Convert the embedding column to EMBEDDING_STORAGE, backfill
+    embedding_bits in resumable batches, then rebuild the HNSW indexes.
+    """
+    target = "halfvec(384)" if Config.EMBEDDING_STORAGE == "halfvec" else "vector(384)"
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            return "❗ Compact embedding storage needs PostgreSQL with pgvector >= 0.7."
+        upgrade_tables(conn)
+        current = conn.execute(text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = CAST(:t AS regclass) AND attname = 'embedding'"
+        ), {"t": TABLE}).scalar()
+        tables = vector_tables(conn)
+        if current != target:
+            # Indexes are bound to the old operator class
+            for table in tables:
+                conn.execute(text(f"DROP INDEX IF EXISTS {table}_embedding_hnsw"))
+            for column in ("embedding", "embedding_shadow"):
+                conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} TYPE {target} USING {column}::{target}"))
+
+    backfilled = 0
+    while Config.BINARY_PREFILTER:
+        # One transaction per batch, so an interrupted run resumes where it stopped
+        with engine.begin() as conn:
+            count = conn.execute(text(
+                f"UPDATE {TABLE} SET embedding_bits = binary_quantize(embedding)::bit(384) "
+                f"WHERE id IN (SELECT id FROM {TABLE} WHERE embedding_bits IS NULL AND embedding IS NOT NULL LIMIT :n)"
+            ), {"n": batch_size}).rowcount
+        backfilled += count
+        if count < batch_size:
+            break
+
+    with engine.begin() as conn:
+        for table in tables:
+            create_vector_index(conn, table)
+    return f"✅ embeddings stored as {target}, {backfilled} rows quantized"
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "migrate":
+        print(migrate())
@@ -0,0 +1,351 @@
+"""
+Zero-downtime embedding model upgrades.
+
+    EMBEDDING_MODEL_NEXT=<model> python -m app.services.reembed run   # fill the shadow column, then switch
+    python -m app.services.reembed status
+    python -m app.services.reembed switch    # switch now; rows still missing are embedded under lock
+    python -m app.services.reembed repair    # re-embed rows written with a non-active model
+
+Every row records the model behind its vectors (embedding_model and
+shadow_model), so the job resumes where it stopped, and search only
+compares a query with vectors from the model that encoded it. The
+switch prepares the shadow bits, indexes and centroids up front, then
+swaps the live and shadow columns in one short transaction.
+"""
+import sys
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import select, update, text, func, or_, and_, bindparam
+from config import Config
+from app.models.base import engine, SessionLocal, upgrade_tables
+from app.models.news_document import NewsDocument
+from app.models.story_cluster import StoryCluster
+from app.models.embedding_state import EmbeddingState
+from .factories import get_embedding_model
+from .quantization import vector_tables, binary_quantize
+from .metrics import register_collector
+
+TABLE = NewsDocument.__tablename__
+_active = {"model": None, "at": 0.0}
+
+# Live/shadow column pairs of news_documents swapped by the switch
+SWAPPED_COLUMNS = (
+    ("embedding", "embedding_shadow"),
+    ("embedding_model", "shadow_model"),
+    ("embedding_bits", "embedding_bits_shadow"),
+)
+# Sign bits kept next to each vector column
+BITS_COLUMNS = {"embedding": "embedding_bits", "embedding_shadow": "embedding_bits_shadow"}
+
+
+def active_model_name(fresh: bool = False) -> str:
+    """Model whose vectors are live, cached for EMBEDDING_STATE_TTL seconds"""
+    now = time.monotonic()
+    if fresh or _active["model"] is None or now - _active["at"] > Config.EMBEDDING_STATE_TTL:
+        session = SessionLocal()
+        try:
+            state = session.get(EmbeddingState, TABLE)
+            model = state.active_model if state and state.active_model else Config.EMBEDDING_MODEL
+        except Exception:
+            # Table not created yet
+            model = _active["model"] or Config.EMBEDDING_MODEL
+        finally:
+            session.close()
+        _active.update(model=model, at=now)
+    return _active["model"]
+
+
+def _state(conn) -> dict:
+    row = conn.execute(select(EmbeddingState).where(EmbeddingState.name == TABLE)).mappings().first()
+    if row is None:
+        conn.execute(EmbeddingState.__table__.insert().values(
+            name=TABLE, active_model=Config.EMBEDDING_MODEL, updated_at=datetime.utcnow()
+        ))
+        return {"name": TABLE, "active_model": Config.EMBEDDING_MODEL, "target_model": None}
+    return dict(row)
+
+
+def _set_state(conn, **values):
+    conn.execute(
+        update(EmbeddingState).where(EmbeddingState.name == TABLE).values(updated_at=datetime.utcnow(), **values)
+    )
+
+
+def _write_vectors(conn, rows, vectors, vector_column: str, version_column: str, model: str):
+    """Write vectors with their model and sign bits (NULL while BINARY_PREFILTER is off)"""
+    table = NewsDocument.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values({
+            vector_column: bindparam("vector", type_=table.c[vector_column].type),
+            version_column: model,
+            BITS_COLUMNS[vector_column]: bindparam("bits", type_=table.c[BITS_COLUMNS[vector_column]].type),
+        })
+    )
+    conn.execute(stmt, [
+        {"row_id": row.id, "vector": vector.tolist(),
+         "bits": binary_quantize(vector) if Config.BINARY_PREFILTER else None}
+        for row, vector in zip(rows, vectors)
+    ])
+
+
+def _pending(target: str):
+    """Rows whose shadow vectors are missing or from another model"""
+    return and_(
+        NewsDocument.embedding.isnot(None),
+        or_(NewsDocument.shadow_model.is_(None), NewsDocument.shadow_model != target)
+    )
+
+
+def _index_exists(conn, name: str) -> bool:
+    return bool(conn.execute(text("SELECT to_regclass(:i)"), {"i": name}).scalar())
+
+
+class Reembedder:
+    """
+    Re-embeds news_documents with EMBEDDING_MODEL_NEXT into the shadow
+    column in batches, at most REEMBED_RATE rows per second and yielding
+    to live searches, then switches the search path over.
+    """
+    def __init__(self, target: str = None):
+        self.target = target or Config.EMBEDDING_MODEL_NEXT
+        self.stop = threading.Event()
+        self.thread = None
+        self.stats = {"embedded": 0, "batches": 0}
+        self.status = "idle"
+
+    def start(self):
+        """Run in a daemon thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="reembed", daemon=True)
+            self.thread.start()
+        return self.thread
+
+    def run(self) -> str:
+        if not self.target:
+            return "❗ Set EMBEDDING_MODEL_NEXT to the model to upgrade to."
+        with engine.begin() as conn:
+            upgrade_tables(conn)
+            state = _state(conn)
+            if state["active_model"] == self.target:
+                self.status = "done"
+                return f"✅ {self.target} is already the active model"
+            if state["target_model"] != self.target:
+                _set_state(conn, target_model=self.target)
+            # Rows from before per-row versioning carry the active model
+            conn.execute(
+                update(NewsDocument)
+                .where(NewsDocument.embedding_model.is_(None), NewsDocument.embedding.isnot(None))
+                .values(embedding_model=state["active_model"])
+            )
+
+        self.status = "embedding"
+        count = self._embed_pass(_pending(self.target), "embedding_shadow", "shadow_model", self.target)
+        if self.stop.is_set():
+            self.status = "stopped"
+            return f"⏸️ Stopped after {count} rows; run again to resume"
+        if not Config.REEMBED_AUTO_SWITCH:
+            self.status = "ready to switch"
+            return f"✅ {count} rows re-embedded with {self.target}; run 'switch' to go live"
+        return self.switch()
+
+    def repair(self) -> str:
+        """Re-embed rows whose live vectors came from another model (e.g. written during a switch)"""
+        active = active_model_name(fresh=True)
+        stale = and_(
+            NewsDocument.embedding.isnot(None),
+            NewsDocument.embedding_model.isnot(None),
+            NewsDocument.embedding_model != active
+        )
+        count = self._embed_pass(stale, "embedding", "embedding_model", active)
+        return f"✅ {count} rows re-embedded with {active}"
+
+    def _embed_pass(self, condition, vector_column: str, version_column: str, model_name: str) -> int:
+        """Walk the table in id order, embedding rows matching `condition`"""
+        model = get_embedding_model(model_name)
+        after_id, total = 0, 0
+        while not self.stop.is_set():
+            self._yield_to_searches()
+            started = time.monotonic()
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select(NewsDocument.id, NewsDocument.content)
+                    .where(NewsDocument.id > after_id, condition)
+                    .order_by(NewsDocument.id)
+                    .limit(Config.REEMBED_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                if not rows:
+                    break
+                vectors = model.encode([row.content or "" for row in rows])
+                _write_vectors(conn, rows, vectors, vector_column, version_column, model_name)
+            after_id = rows[-1].id
+            total += len(rows)
+            self.stats["embedded"] += len(rows)
+            self.stats["batches"] += 1
+            # Throttle to REEMBED_RATE rows per second
+            time.sleep(max(0.0, len(rows) / Config.REEMBED_RATE - (time.monotonic() - started)))
+        return total
+
+    def _yield_to_searches(self, max_wait: float = 2.0):
+        from .news_tools import search_flight
+        deadline = time.monotonic() + max_wait
+        while search_flight.in_flight() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def switch(self) -> str:
+        """
+        Make the shadow vectors live. The shadow vectors are caught up, and
+        their sign bits, indexes and cluster centroids prepared, before the
+        switch transaction. Inside it, writes wait while the few rows ingested
+        since are embedded; searches keep reading until the final column
+        renames, which are catalog-only and commit right away.
+        """
+        target = self.target
+        postgres = engine.dialect.name == "postgresql"
+        model = get_embedding_model(target)
+        with engine.begin() as conn:
+            upgrade_tables(conn)
+            if _state(conn)["target_model"] != target:
+                return f"❗ No upgrade to {target} in progress"
+
+        # Everything expensive runs here, without blocking searches or ingest
+        self._embed_pass(_pending(target), "embedding_shadow", "shadow_model", target)
+        if postgres and Config.BINARY_PREFILTER:
+            self._fill_shadow_bits()
+        with engine.begin() as conn:
+            self._recompute_centroids(conn)
+        if postgres:
+            # Index the shadow vectors (and their bits) before they go live
+            ops = "halfvec_cosine_ops" if Config.EMBEDDING_STORAGE == "halfvec" else "vector_cosine_ops"
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for table in vector_tables(conn):
+                    if _index_exists(conn, f"{table}_embedding_hnsw"):
+                        conn.execute(text(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_embedding_shadow_hnsw ON {table} "
+                            f"USING hnsw (embedding_shadow {ops})"
+                        ))
+                    if _index_exists(conn, f"{table}_embedding_bits_hnsw"):
+                        conn.execute(text(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_embedding_bits_shadow_hnsw ON {table} "
+                            f"USING hnsw (embedding_bits_shadow bit_hamming_ops)"
+                        ))
+
+        with engine.begin() as conn:
+            if _state(conn)["target_model"] != target:
+                return f"❗ No upgrade to {target} in progress"
+            if postgres:
+                # Ingest writes wait until the switch commits; searches keep reading
+                conn.execute(text(f"LOCK TABLE {TABLE}, story_clusters IN SHARE ROW EXCLUSIVE MODE"))
+
+            # Rows ingested since the catch-up pass, and the clusters they changed
+            remaining = conn.execute(
+                select(NewsDocument.id, NewsDocument.content, NewsDocument.cluster_id).where(_pending(target))
+            ).all()
+            for i in range(0, len(remaining), Config.REEMBED_BATCH_SIZE):
+                chunk = remaining[i:i + Config.REEMBED_BATCH_SIZE]
+                _write_vectors(conn, chunk, model.encode([r.content or "" for r in chunk]),
+                               "embedding_shadow", "shadow_model", target)
+            changed = {r.cluster_id for r in remaining if r.cluster_id is not None}
+            changed |= set(conn.execute(
+                select(StoryCluster.id).where(StoryCluster.centroid_shadow.is_(None))
+            ).scalars())
+            if changed:
+                self._recompute_centroids(conn, changed)
+
+            # From here to commit searches wait too: renames only, no row is touched
+            for table, pairs in ((TABLE, SWAPPED_COLUMNS), ("story_clusters", (("centroid", "centroid_shadow"),))):
+                for live, shadow in pairs:
+                    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {live} TO {live}_swap"))
+                    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {live}"))
+                    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {live}_swap TO {shadow}"))
+
+            if postgres:
+                for table in vector_tables(conn):
+                    for index in (f"{table}_embedding_hnsw", f"{table}_embedding_bits_hnsw"):
+                        shadow_index = index.replace("_hnsw", "_shadow_hnsw")
+                        if _index_exists(conn, shadow_index):
+                            # The old vectors stay for rollback, but lose their index
+                            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+                            conn.execute(text(f"ALTER INDEX {shadow_index} RENAME TO {index}"))
+
+            _set_state(conn, active_model=target, target_model=None)
+
+        _active["model"] = None
+        self.status = "done"
+        return f"✅ Switched search to {target} ({len(remaining)} rows embedded at switch time)"
+
+    def _fill_shadow_bits(self, batch_size: int = 5000):
+        """Sign bits for shadow vectors written without them, in resumable batches"""
+        while True:
+            with engine.begin() as conn:
+                count = conn.execute(text(
+                    f"UPDATE {TABLE} SET embedding_bits_shadow = binary_quantize(embedding_shadow)::bit(384) "
+                    f"WHERE id IN (SELECT id FROM {TABLE} "
+                    f"WHERE embedding_bits_shadow IS NULL AND embedding_shadow IS NOT NULL LIMIT :n)"
+                ), {"n": batch_size}).rowcount
+            if count < batch_size:
+                return
+
+    def _recompute_centroids(self, conn, cluster_ids=None):
+        """Shadow centroids: the mean shadow vector of each cluster (or only of `cluster_ids`)"""
+        if conn.dialect.name == "postgresql":
+            only = "AND cluster_id = ANY(:ids) " if cluster_ids is not None else ""
+            conn.execute(text(
+                f"UPDATE story_clusters c SET centroid_shadow = m.centroid FROM ("
+                f"SELECT cluster_id, avg(embedding_shadow)::vector AS centroid FROM {TABLE} "
+                f"WHERE cluster_id IS NOT NULL AND embedding_shadow IS NOT NULL {only}GROUP BY cluster_id"
+                f") m WHERE c.id = m.cluster_id"
+            ), {"ids": list(cluster_ids)} if cluster_ids is not None else {})
+            return
+
+        import numpy as np
+        sums = {}
+        stmt = (
+            select(NewsDocument.cluster_id, NewsDocument.embedding_shadow)
+            .where(NewsDocument.cluster_id.isnot(None), NewsDocument.embedding_shadow.isnot(None))
+        )
+        if cluster_ids is not None:
+            stmt = stmt.where(NewsDocument.cluster_id.in_(cluster_ids))
+        for cluster_id, embedding in conn.execute(stmt):
+            total, count = sums.get(cluster_id, (0, 0))
+            sums[cluster_id] = (total + np.asarray(embedding, dtype=np.float32), count + 1)
+        for cluster_id, (total, count) in sums.items():
+            conn.execute(
+                update(StoryCluster).where(StoryCluster.id == cluster_id).values(centroid_shadow=(total / count).tolist())
+            )
+
+
+def status() -> dict:
+    with engine.begin() as conn:
+        state = _state(conn)
+        counts = conn.execute(select(
+            func.count(NewsDocument.embedding),
+            func.count().filter(NewsDocument.shadow_model == state["target_model"]),
+        )).one()
+    return {**state, "embedded_rows": counts[0], "shadow_rows": counts[1] if state["target_model"] else 0}
+
+
+# Background job started at warm-up when REEMBED_IN_BACKGROUND is set
+reembedder = Reembedder()
+
+
+@register_collector
+def _reembed_metrics():
+    return [
+        ("news_reembed_rows_total", "counter", "Rows re-embedded by the model upgrade job",
+         [({}, reembedder.stats["embedded"])]),
+    ]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "run":
+        print(reembedder.run())
+    elif command == "switch":
+        print(reembedder.switch())
+    elif command == "repair":
+        print(reembedder.repair())
+    print(status())
@@ -0,0 +1,53 @@
+import threading
+
+
+class _Call:
+    """An in-flight execution shared by every caller with the same key"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+    The first caller runs the function; callers arriving while it is
+    running wait for it and receive the same result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Number of keys currently executing"""
+        with self._lock:
+            return len(self._calls)
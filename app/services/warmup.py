@@ -0,0 +1,63 @@
+import time
+import threading
+from config import Config
+from app.models.base import create_tables
+from app.services.factories import get_embedding_model, get_groq_llm, get_mistral_llm
+from app.services.partitions import maintain_partitions
+from app.services.reembed import active_model_name, reembedder
+
+
+class Warmup:
+    """
+    Builds the heavy components in a background thread after the server
+    has started, and tracks whether the service is ready for traffic.
+    """
+    def __init__(self):
+        self.status = "pending"
+        self.stages = {}
+        self.error = None
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self, agent, scraper):
+        if self.thread is not None:
+            return
+        self.status = "warming"
+        self.thread = threading.Thread(target=self._run, args=(agent, scraper), name="warmup", daemon=True)
+        self.thread.start()
+
+    def _stage(self, name, fn):
+        start = time.perf_counter()
+        fn()
+        self.stages[name] = round(time.perf_counter() - start, 3)
+        print(f"✅ Warm-up: {name} ready in {self.stages[name]}s")
+
+    def _run(self, agent, scraper):
+        try:
+            self._stage("database", create_tables)
+            self._stage("partitions", maintain_partitions)
+            self._stage("embedding_model", lambda: get_embedding_model(active_model_name()).encode("warm up"))
+            self._stage("llm_clients", lambda: (get_groq_llm(), get_mistral_llm()))
+            self._stage("agent_graph", lambda: agent.graph)
+            self.status = "ready"
+            self.ready.set()
+            print("🎉 Smart News Chat Bot is ready!")
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"❌ Warm-up failed: {str(e)}")
+            return
+
+        if Config.REEMBED_IN_BACKGROUND and Config.EMBEDDING_MODEL_NEXT:
+            print(f"🔄 Re-embedding news with {Config.EMBEDDING_MODEL_NEXT} in the background...")
+            reembedder.start()
+
+        if Config.SCRAPE_ON_STARTUP:
+            print("🔄 Auto-scraping news on startup...")
+            print(scraper.scrape_and_store())
+
+    def snapshot(self):
+        return {"status": self.status, "stages": dict(self.stages), "error": self.error}
+
+
+warmup = Warmup()
@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, timedelta
+
+# Vocabulary per category, so generated articles cluster by topic
+TOPICS = {
+    "Technology": ["AI", "chip", "startup", "software", "cloud", "robotics", "smartphone", "cybersecurity", "quantum", "model"],
+    "Politics": ["election", "senate", "minister", "policy", "vote", "parliament", "campaign", "treaty", "coalition", "reform"],
+    "Health": ["vaccine", "hospital", "study", "virus", "diet", "therapy", "clinical", "outbreak", "cancer", "wellness"],
+    "Sports": ["match", "league", "goal", "champion", "coach", "tournament", "transfer", "olympics", "record", "final"],
+    "Business": ["market", "shares", "merger", "earnings", "CEO", "inflation", "bank", "trade", "revenue", "investors"],
+    "Science": ["space", "telescope", "climate", "species", "physics", "mission", "fossil", "genome", "ocean", "discovery"],
+    "Entertainment": ["film", "album", "festival", "series", "actor", "premiere", "streaming", "award", "concert", "box office"],
+}
+
+VERBS = ["announces", "reveals", "faces", "launches", "wins", "warns about", "delays", "expands", "questions", "backs"]
+PLACES = ["in Europe", "in Asia", "in the US", "worldwide", "in India", "in Africa", "in Latin America", "at home"]
+
+
+def generate_article(index: int, seed: int = 0, duplicate_rate: float = 0.0) -> dict:
+    """
+    Build one deterministic NewsAPI-shaped article. With probability
+    `duplicate_rate` it is a syndicated copy of an earlier article.
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    if index and rng.random() < duplicate_rate:
+        original = generate_article(rng.randrange(index), seed)
+        return {
+            **original,
+            "source": {"id": None, "name": f"Syndicate {index % 5}"},
+            "title": f"{original['title']} - Syndicate {index % 5}",
+            "url": f"https://syndicate{index % 5}.example.com/{seed}/{index}",
+        }
+    category = rng.choice(sorted(TOPICS))
+    words = TOPICS[category]
+    subject, obj = rng.sample(words, 2)
+    title = f"{subject.capitalize()} {rng.choice(VERBS)} {obj} {rng.choice(PLACES)} #{index}"
+    description = " ".join(
+        f"{rng.choice(words)} {rng.choice(VERBS)} {rng.choice(words)} {rng.choice(PLACES)}."
+        for _ in range(rng.randint(2, 5))
+    )
+    published = datetime(2025, 1, 1) + timedelta(minutes=index * 7 + rng.randint(0, 6))
+    return {
+        "source": {"id": None, "name": f"Wire {index % 17}"},
+        "title": title,
+        "description": description,
+        "url": f"https://bench.example.com/{seed}/{category.lower()}/{index}",
+        "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "category": category,
+    }
+
+
+def generate_articles(count: int, seed: int = 0, start: int = 0, duplicate_rate: float = 0.0) -> list:
+    """Build `count` deterministic articles starting at `start`"""
+    return [generate_article(i, seed, duplicate_rate) for i in range(start, start + count)]
+
+
+def generate_queries(count: int, seed: int = 0) -> list:
+    """Build deterministic user queries spread over the topic vocabulary"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = TOPICS[rng.choice(sorted(TOPICS))]
+        queries.append(f"latest {rng.choice(words)} and {rng.choice(words)} news")
+    return queries
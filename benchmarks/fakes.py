@@ -0,0 +1,147 @@
+import re
+import json
+import time
+import zlib
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from .data import TOPICS, generate_articles
+
+EMBEDDING_DIM = 384
+
+
+class FakeEmbedder:
+    """
+    Deterministic stand-in for SentenceTransformer. Words are hashed into
+    buckets, so texts sharing words get similar vectors.
+    """
+    latency = 0.0
+    per_text_latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def _vector(self, text):
+        vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vec[zlib.crc32(word.encode()) % EMBEDDING_DIM] += 1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        time.sleep(self.latency + self.per_text_latency * len(batch))
+        vectors = np.stack([self._vector(t) for t in batch]) if batch else np.zeros((0, EMBEDDING_DIM))
+        return vectors[0] if single else vectors
+
+
+class FakeChatModel:
+    """
+    Deterministic stand-in for ChatGroq / ChatMistralAI. Recognises the
+    prompts this app sends and answers in the expected shape, sleeping
+    for a simulated network + generation time.
+    """
+    latency = 0.0
+    per_token_latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+
+    def _prompt_text(self, prompt):
+        if isinstance(prompt, str):
+            return prompt
+        return "\n".join(getattr(m, "content", str(m)) for m in prompt)
+
+    def _category(self, text):
+        lowered = text.lower()
+        scores = {c: sum(w.lower() in lowered for w in words) for c, words in TOPICS.items()}
+        return max(sorted(scores), key=lambda c: scores[c])
+
+    def _answer(self, text):
+        if "Which articles are relevant" in text:
+            count = len(re.findall(r"^\d+\. Title:", text, flags=re.MULTILINE))
+            return ",".join(str(i) for i in range(1, count + 1, 2))
+        if "for each news article below" in text:
+            articles = re.findall(r"^\[(\d+)\] (.+)$", text, flags=re.MULTILINE)
+            return "\n".join(f"{n}: {self._category(body)}" for n, body in articles)
+        if "ONE short category" in text:
+            return self._category(text)
+        if text.startswith("Write a digest for each article"):
+            titles = re.findall(r"^\[(\d+)\] (?:\(.*?\) )?(.+)$", text, flags=re.MULTILINE)
+            return "\n".join(f"[{n}] {title}. Entities: {title.split()[0]}" for n, title in titles)
+        if text.startswith("Translate"):
+            return text.split("Content to translate:\n", 1)[-1]
+        titles = re.findall(r"\*\*Title:\*\* (.+)", text)
+        return "Summary: " + "; ".join(titles[:5]) if titles else "Summary: " + text[:200]
+
+    def invoke(self, prompt, **kwargs):
+        text = self._prompt_text(prompt)
+        answer = self._answer(text)
+        prompt_tokens = len(text) // 4
+        completion_tokens = len(answer) // 4
+        time.sleep(self.latency + self.per_token_latency * (prompt_tokens + completion_tokens))
+        return SimpleNamespace(
+            content=answer,
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens},
+            response_metadata={}
+        )
+
+
+class FakeNewsAPI:
+    """
+    Local HTTP server imitating NewsAPI top-headlines. Each request
+    returns the next page of synthetic articles until `total` is served.
+    """
+    def __init__(self, total: int, seed: int = 0, latency: float = 0.0, duplicate_rate: float = 0.0):
+        self.total = total
+        self.seed = seed
+        self.duplicate_rate = duplicate_rate
+        self.latency = latency
+        self.served = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/v2/top-headlines"
+
+    def _next_page(self, size):
+        with self.lock:
+            start = self.served
+            count = max(0, min(size, self.total - start))
+            self.served += count
+        return generate_articles(count, self.seed, start, self.duplicate_rate)
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                size = int(params.get("pageSize", ["50"])[0])
+                time.sleep(api.latency)
+                articles = api._next_page(size)
+                body = json.dumps({"status": "ok", "totalResults": len(articles), "articles": articles}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,152 @@
+"""
+Recall-vs-latency benchmark for compact embedding storage.
+
+Ingests a synthetic corpus with BINARY_PREFILTER on, then compares the
+candidates of the exact cosine_distance search used by search_news with
+the Hamming prefilter + rerank at several shortlist sizes. Half-precision
+quality is measured in memory against the float32 ranking; run with
+EMBEDDING_STORAGE=halfvec against PostgreSQL for its query latency.
+
+    python -m benchmarks.recall --corpus-size 2000 --candidates 50,100,200,400
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+from .data import generate_queries
+from .run import configure_environment, install_sqlite_vector_ops, latency_summary, reset_database, bench_ingest, git_commit
+
+EMBEDDING_DIM = 384
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recall vs latency of compact embedding search")
+    parser.add_argument("--corpus-size", type=int, default=2000, help="Articles to ingest")
+    parser.add_argument("--queries", type=int, default=50, help="Queries to evaluate")
+    parser.add_argument("--candidates", default="50,100,200,400", help="Comma-separated prefilter shortlist sizes")
+    parser.add_argument("--k", type=int, default=10, help="Depth at which recall is measured")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Share of syndicated near-duplicate articles")
+    parser.add_argument("--database-url", default=None, help="Database to use instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_recall.json")
+    parser.set_defaults(llm_latency=0.0, llm_token_latency=0.0, embed_latency=0.0, newsapi_latency=0.0, respect_limits=False)
+    return parser.parse_args(argv)
+
+
+def recall(found, expected, k):
+    expected = expected[:k]
+    return len(set(found[:k]) & set(expected)) / len(expected) if expected else 1.0
+
+
+def timed_candidates(tools, session, embedding, prefilter):
+    start = time.perf_counter()
+    rows = tools.fetch_candidates(session, embedding, mode="articles", prefilter=prefilter)
+    elapsed = time.perf_counter() - start
+    session.rollback()  # ends the transaction holding any SET LOCAL
+    return [hit.id for hit in rows], elapsed
+
+
+def bench_prefilter(embeddings, candidate_sizes, k):
+    """Exact cosine candidates vs Hamming shortlist + rerank"""
+    from config import Config
+    from app.models.base import SessionLocal
+    from app.services.news_tools import NewsTools
+
+    tools = NewsTools()
+    session = SessionLocal()
+    try:
+        exact, samples = [], []
+        for embedding in embeddings:
+            ids, elapsed = timed_candidates(tools, session, embedding, prefilter=False)
+            exact.append(ids)
+            samples.append(elapsed)
+        results = {"exact": {**latency_summary(samples), "recall": 1.0}}
+
+        for size in candidate_sizes:
+            Config.PREFILTER_CANDIDATES = size
+            recalls, samples = [], []
+            for embedding, expected in zip(embeddings, exact):
+                ids, elapsed = timed_candidates(tools, session, embedding, prefilter=True)
+                recalls.append(recall(ids, expected, k))
+                samples.append(elapsed)
+            results[f"prefilter_{size}"] = {**latency_summary(samples), "recall": sum(recalls) / len(recalls)}
+    finally:
+        session.close()
+    return results
+
+
+def bench_half_precision(embeddings, k):
+    """Recall of a float16 ranking against the float32 ranking, in memory"""
+    import numpy as np
+    from sqlalchemy import select
+    from app.models.base import SessionLocal
+    from app.models.news_document import NewsDocument
+
+    session = SessionLocal()
+    try:
+        stored = session.execute(
+            select(NewsDocument.embedding).where(NewsDocument.duplicate_of.is_(None), NewsDocument.embedding.isnot(None))
+        ).scalars().all()
+    finally:
+        session.close()
+    corpus = np.array([np.asarray(e, dtype=np.float32) for e in stored])
+    corpus /= np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+    half = corpus.astype(np.float16)
+
+    recalls = []
+    for embedding in embeddings:
+        query = np.asarray(embedding, dtype=np.float32)
+        expected = list(np.argsort(-(corpus @ query), kind="stable")[:k])
+        found = list(np.argsort(-(half @ query.astype(np.float16)).astype(np.float32), kind="stable")[:k])
+        recalls.append(recall(found, expected, k))
+    return {"recall": sum(recalls) / len(recalls) if recalls else None}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="news-recall-")
+    os.environ["BINARY_PREFILTER"] = "true"
+    configure_environment(args, workdir)
+
+    from config import Config
+    from app.models.base import engine
+    from app.services.factories import get_embedding_model
+    if engine.dialect.name == "sqlite":
+        install_sqlite_vector_ops(engine)
+
+    print(f"📊 corpus size {args.corpus_size}", file=sys.stderr)
+    reset_database()
+    ingest = bench_ingest(args.corpus_size, args)
+    model = get_embedding_model()
+    embeddings = [model.encode(q).tolist() for q in generate_queries(args.queries, args.seed)]
+    candidate_sizes = [int(s) for s in args.candidates.split(",") if s.strip()]
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "database": engine.dialect.name,
+        "embedding_storage": Config.EMBEDDING_STORAGE,
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "ingest": ingest,
+        "bytes_per_row": {
+            "vector": 4 * EMBEDDING_DIM + 8,
+            "halfvec": 2 * EMBEDDING_DIM + 8,
+            "bit": EMBEDDING_DIM // 8 + 8,
+        },
+        f"recall_at_{args.k}": {
+            "search": bench_prefilter(embeddings, candidate_sizes, args.k),
+            "half_precision": bench_half_precision(embeddings, args.k),
+        },
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Offline benchmark harness.
+
+Runs the real ingest, search, agent and HTTP code paths against fake chat
+models, a fake embedder, a local fake NewsAPI server and (by default) a
+SQLite database with the pgvector operators emulated, then writes the
+results as JSON so runs can be compared across commits.
+
+    python -m benchmarks.run --corpus-sizes 500,2000 --output bench.json
+
+Pass --database-url to benchmark against a real PostgreSQL + pgvector.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import platform
+import subprocess
+from datetime import datetime
+
+from .data import generate_queries
+from .fakes import FakeEmbedder, FakeChatModel, FakeNewsAPI
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the news chat bot")
+    parser.add_argument("--corpus-sizes", default="500", help="Comma-separated corpus sizes to ingest")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per latency benchmark")
+    parser.add_argument("--chat-requests", type=int, default=100, help="Requests for the /chat/ benchmark")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent /chat/ clients")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Fake LLM base latency (s)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="Fake LLM latency per token (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="Fake embedding latency per call (s)")
+    parser.add_argument("--newsapi-latency", type=float, default=0.01, help="Fake NewsAPI latency per page (s)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Share of syndicated near-duplicate articles")
+    parser.add_argument("--search-modes", default="articles,clusters", help="Comma-separated search modes to benchmark")
+    parser.add_argument("--database-url", default=None, help="Database to use instead of a temporary SQLite file")
+    parser.add_argument("--respect-limits", action="store_true", help="Keep the configured provider rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    """Point the app at fakes. Must run before any app module is imported."""
+    os.environ.setdefault("NEWS_API_KEY", "bench")
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("MISTRAL_API_KEY", "bench")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    if not args.respect_limits:
+        for provider in ("GROQ", "MISTRAL", "NEWSAPI"):
+            os.environ[f"{provider}_RATE"] = "1000000"
+            os.environ[f"{provider}_BURST"] = "1000000"
+            os.environ[f"{provider}_CONCURRENCY"] = "256"
+        os.environ["PROVIDER_MAX_QUEUE"] = "100000"
+
+    FakeChatModel.latency = args.llm_latency
+    FakeChatModel.per_token_latency = args.llm_token_latency
+    FakeEmbedder.latency = args.embed_latency
+
+    import sentence_transformers
+    import langchain_groq.chat_models
+    import langchain_mistralai.chat_models
+    sentence_transformers.SentenceTransformer = FakeEmbedder
+    langchain_groq.chat_models.ChatGroq = FakeChatModel
+    langchain_mistralai.chat_models.ChatMistralAI = FakeChatModel
+
+
+def install_sqlite_vector_ops(engine):
+    """Emulate the pgvector distance operators with SQLite functions"""
+    import numpy as np
+    from sqlalchemy import event
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.sql.expression import BinaryExpression
+
+    from sqlalchemy.dialects.postgresql import BIT
+
+    functions = {
+        "<=>": "vec_cosine_distance", "<->": "vec_l2_distance",
+        "<#>": "vec_negative_inner_product", "<~>": "bit_hamming_distance",
+    }
+
+    @compiles(BIT, "sqlite")
+    def _bit_type(element, compiler, **kw):
+        return "TEXT"
+
+    @compiles(BinaryExpression, "sqlite")
+    def _vector_ops(element, compiler, **kw):
+        name = functions.get(getattr(element.operator, "opstring", None))
+        if name is None:
+            return compiler.visit_binary(element, **kw)
+        return f"{name}({compiler.process(element.left, **kw)}, {compiler.process(element.right, **kw)})"
+
+    def parse(value):
+        return np.array(json.loads(value), dtype=np.float32)
+
+    def cosine(a, b):
+        a, b = parse(a), parse(b)
+        denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+        return 1.0 - float(a @ b) / denom if denom else 1.0
+
+    @event.listens_for(engine, "connect")
+    def _register(dbapi_connection, _):
+        dbapi_connection.create_function("vec_cosine_distance", 2, cosine)
+        dbapi_connection.create_function("vec_l2_distance", 2, lambda a, b: float(np.linalg.norm(parse(a) - parse(b))))
+        dbapi_connection.create_function("vec_negative_inner_product", 2, lambda a, b: -float(parse(a) @ parse(b)))
+        dbapi_connection.create_function("bit_hamming_distance", 2, lambda a, b: sum(x != y for x, y in zip(a, b)))
+
+
+def latency_summary(samples):
+    """p50/p95/p99/mean of a list of durations in seconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered),
+        "p50_ms": 1000 * pct(0.50),
+        "p95_ms": 1000 * pct(0.95),
+        "p99_ms": 1000 * pct(0.99),
+        "max_ms": 1000 * ordered[-1],
+    }
+
+
+def reset_database():
+    from app.models.base import Base, engine, create_tables
+    from app.models import news_document, source_state, embedding_state  # noqa: F401  registers the tables
+    Base.metadata.drop_all(bind=engine)
+    create_tables()
+
+
+def bench_ingest(size, args):
+    """Ingest `size` articles from the fake NewsAPI through scrape_and_store"""
+    from config import Config
+    from app.models.base import SessionLocal
+    from app.models.news_document import NewsDocument
+    from app.services.news_scraper import NewsScraper
+
+    api = FakeNewsAPI(size, seed=args.seed, latency=args.newsapi_latency, duplicate_rate=args.duplicate_rate).start()
+    Config.NEWS_API_URL = api.url
+    scraper = NewsScraper()
+    calls = 0
+    start = time.perf_counter()
+    try:
+        while api.served < size:
+            result = scraper.scrape_and_store()
+            calls += 1
+            if result.startswith("❌"):
+                raise RuntimeError(result)
+    finally:
+        elapsed = time.perf_counter() - start
+        api.stop()
+
+    session = SessionLocal()
+    stored = session.query(NewsDocument).count()
+    duplicates = session.query(NewsDocument).filter(NewsDocument.duplicate_of.isnot(None)).count()
+    session.close()
+    return {
+        "articles": size,
+        "stored": stored,
+        "near_duplicates": duplicates,
+        "scrape_calls": calls,
+        "seconds": elapsed,
+        "articles_per_second": size / elapsed if elapsed else None,
+    }
+
+
+def bench_search(queries, mode):
+    from config import Config
+    from app.services.news_tools import NewsTools
+    Config.SEARCH_MODE = mode
+    tools = NewsTools()
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        tools.search_news(query)
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def bench_search_batch(queries):
+    """All queries through one search_news_batch call vs the same queries one by one through search_news"""
+    from app.services.news_tools import NewsTools
+    tools = NewsTools()
+    start = time.perf_counter()
+    _, shed = tools.search_news_batch(queries)
+    batch = time.perf_counter() - start
+    start = time.perf_counter()
+    for query in queries:
+        tools.search_news(query)
+    sequential = time.perf_counter() - start
+    return {
+        "queries": len(queries),
+        "shed": shed,
+        "batch_seconds": batch,
+        "sequential_seconds": sequential,
+        "speedup": sequential / batch if batch else None,
+    }
+
+
+def bench_process_message(queries):
+    from app.services.agent import NewsAgentGraph
+    agent = NewsAgentGraph()
+    samples = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        agent.process_message(query, f"bench-{i}")
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+async def _bench_chat(queries, total, concurrency):
+    import httpx
+    from app.main import app
+
+    limit = asyncio.Semaphore(concurrency)
+    samples, statuses = [], {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with limit:
+                start = time.perf_counter()
+                response = await client.post("/chat/", json={
+                    "message": queries[i % len(queries)],
+                    "session_id": f"bench-chat-{i}"
+                })
+                samples.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        **latency_summary(samples),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests_per_second": total / elapsed if elapsed else None,
+        "status_codes": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def bench_chat(queries, total, concurrency):
+    return asyncio.run(_bench_chat(queries, total, concurrency))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="news-bench-")
+    configure_environment(args, workdir)
+
+    from app.models.base import engine
+    if engine.dialect.name == "sqlite":
+        install_sqlite_vector_ops(engine)
+
+    queries = generate_queries(args.queries, args.seed)
+    runs = []
+    for size in [int(s) for s in args.corpus_sizes.split(",") if s.strip()]:
+        print(f"📊 corpus size {size}", file=sys.stderr)
+        reset_database()
+        run = {"corpus_size": size}
+        run["ingest"] = bench_ingest(size, args)
+        run["search_news"] = {
+            mode: bench_search(queries, mode) for mode in args.search_modes.split(",") if mode.strip()
+        }
+        run["search_news_batch"] = bench_search_batch(queries)
+        run["process_message"] = bench_process_message(queries)
+        run["chat"] = bench_chat(queries, args.chat_requests, args.concurrency)
+        runs.append(run)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
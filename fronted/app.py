@@ -1,20 +1,118 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
+import json
 import re
 import os
-import base64
 
 # Configuration
-API_BASE_URL = "http://localhost:8000"  # Change if your API is hosted elsewhere
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")  # Change if your API is hosted elsewhere
+CONNECT_TIMEOUT = 5      # seconds to reach the API
+READ_TIMEOUT = 300       # seconds between bytes while a reply is being produced
+SCRAPE_TIMEOUT = 600
+HISTORY_WINDOW = 40      # messages rendered before older ones are collapsed
+
+PDF_CREATED = re.compile(r"📄 PDF created successfully: (\S+\.pdf)")
+STEP_LABELS = {
+    "search_news": "🔍 Searching news",
+    "browse": "🗞️ Gathering latest news",
+    "summarize": "📝 Summarizing",
+    "translate": "🌍 Translating",
+    "create_pdf": "📄 Creating PDF",
+    "send_email": "📧 Sending email",
+    "follow_up": "💬 Suggestions",
+}
+
+
+@st.cache_resource
+def api_session():
+    """One pooled HTTP session per server process, shared by all reruns and users"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def fetch_report(filename, session_id):
+    """PDF bytes from the API, fetched once per report; only the creating session may download it"""
+    response = api_session().get(
+        f"{API_BASE_URL}/news/reports/{filename}", params={"session_id": session_id},
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+    )
+    response.raise_for_status()
+    return response.content
+
+
+def render_blocks(content):
+    """Parse a reply once into (kind, text) blocks for display"""
+    if content.startswith(("📄", "📧")):
+        return [("success", content)]
+    if content.startswith("❌"):
+        return [("error", content)]
+    if content.startswith("❗"):
+        return [("warning", content)]
+    # Handle news results with better formatting
+    if "1. " in content and ("http" in content or "www." in content):
+        blocks = []
+        for part in content.split("\n"):
+            if part.strip().startswith(("http", "www.")):
+                blocks.append(("markdown", f"[🔗 {part}]({part})"))
+            else:
+                blocks.append(("markdown", part))
+        return blocks
+    return [("markdown", content)]
+
+
+def show_blocks(blocks):
+    for kind, text in blocks:
+        getattr(st, kind)(text)
+
+
+def add_message(role, content):
+    """Store a message together with its parsed blocks, so reruns never re-parse history"""
+    st.session_state.messages.append({"role": role, "content": content, "blocks": render_blocks(content)})
+    match = PDF_CREATED.search(content) if role == "assistant" else None
+    if match:
+        st.session_state.last_pdf = os.path.basename(match.group(1))
+
+
+def stream_chat(prompt, placeholder):
+    """Post to the streaming chat endpoint, showing each step's output as it finishes"""
+    response = api_session().post(
+        f"{API_BASE_URL}/chat/stream/",
+        json={"message": prompt, "session_id": st.session_state.session_id},
+        stream=True,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    )
+    with response:
+        if response.status_code != 200:
+            return f"❌ API Error: {response.status_code} - {response.text}"
+        finished = []
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "step":
+                finished.append(event)
+                with placeholder.container():
+                    for step in finished:
+                        st.caption(f"{STEP_LABELS.get(step['action'], step['action'])} ✓")
+                    show_blocks(render_blocks(event["content"]))
+            else:
+                return event["response"]
+    return "❌ The response stream ended early."
+
 
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "session_id" not in st.session_state:
     st.session_state.session_id = f"session_{datetime.now().timestamp()}"
-if "last_pdf_path" not in st.session_state:
-    st.session_state.last_pdf_path = None
+if "last_pdf" not in st.session_state:
+    st.session_state.last_pdf = None
 
 # Page setup
 st.set_page_config(page_title="Smart News Chat Bot", page_icon="🤖")
@@ -24,21 +122,26 @@ st.caption("Your AI-powered news assistant with search, summarize, translate, an
 # Sidebar for controls
 with st.sidebar:
     st.header("Controls")
-    
+
     if st.button("New Conversation"):
         st.session_state.messages = []
         st.session_state.session_id = f"session_{datetime.now().timestamp()}"
-        st.session_state.last_pdf_path = None
+        st.session_state.last_pdf = None
         st.rerun()
-    
+
     if st.button("Refresh News Data"):
         with st.spinner("Updating news database..."):
-            response = requests.post(f"{API_BASE_URL}/scrape-news")
-            if response.status_code == 200:
-                st.success(response.json().get("message", "News updated!"))
-            else:
-                st.error("Failed to update news")
-    
+            try:
+                response = api_session().post(
+                    f"{API_BASE_URL}/news/scrape/", timeout=(CONNECT_TIMEOUT, SCRAPE_TIMEOUT)
+                )
+                if response.status_code == 200:
+                    st.success(response.json().get("message", "News updated!"))
+                else:
+                    st.error(f"Failed to update news: {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                st.error(f"Connection error: {str(e)}")
+
     st.markdown("---")
     st.markdown("### Features")
     st.markdown("""
@@ -48,7 +151,7 @@ with st.sidebar:
     - 📄 Create PDF reports
     - 📧 Email news to anyone
     """)
-    
+
     st.markdown("---")
     st.markdown("### Example Commands")
     st.markdown("""
@@ -59,106 +162,53 @@ with st.sidebar:
     - "Email to me@example.com"
     """)
 
-    # PDF download section
-    if st.session_state.last_pdf_path and os.path.exists(st.session_state.last_pdf_path):
+    # PDF download section: the report is only fetched from the API when asked for
+    if st.session_state.last_pdf:
         st.markdown("---")
         st.markdown("### Last Generated PDF")
-        with open(st.session_state.last_pdf_path, "rb") as f:
-            pdf_data = f.read()
-            st.download_button(
-                label="Download PDF",
-                data=pdf_data,
-                file_name=os.path.basename(st.session_state.last_pdf_path),
-                mime="application/pdf"
-            )
-
-# Display chat history
-for message in st.session_state.messages:
-    role = "user" if message["role"] == "user" else "assistant"
-    with st.chat_message(role):
-        content = message["content"]
-        
-        # Special handling for different message types
-        if content.startswith("📄 PDF created successfully:"):
-            st.success(content)
-            pdf_path = content.split(": ")[1]
-            st.session_state.last_pdf_path = pdf_path
-            st.rerun()
-        elif content.startswith("📧"):
-            st.success(content)
-        elif content.startswith("❌"):
-            st.error(content)
-        elif content.startswith("❗"):
-            st.warning(content)
-        else:
-            # Handle news results with better formatting
-            if "1. " in content and ("http" in content or "www." in content):
-                parts = content.split("\n")
-                for part in parts:
-                    if part.strip().startswith("http") or part.strip().startswith("www."):
-                        st.markdown(f"[🔗 {part}]({part})")
-                    else:
-                        st.markdown(part)
-            else:
-                st.markdown(content)
+        filename = st.session_state.last_pdf
+        if st.button("Prepare PDF download"):
+            st.session_state.pdf_requested = filename
+        if st.session_state.get("pdf_requested") == filename:
+            try:
+                st.download_button(
+                    label="Download PDF",
+                    data=fetch_report(filename, st.session_state.session_id),
+                    file_name=filename,
+                    mime="application/pdf"
+                )
+            except requests.exceptions.RequestException as e:
+                st.error(f"Could not fetch the PDF: {str(e)}")
+
+# Display chat history: the newest messages, with older ones collapsed
+messages = st.session_state.messages
+older = len(messages) - HISTORY_WINDOW
+if older > 0 and not st.checkbox(f"Show {older} earlier messages"):
+    messages = messages[-HISTORY_WINDOW:]
+for message in messages:
+    with st.chat_message("user" if message["role"] == "user" else "assistant"):
+        show_blocks(message.get("blocks") or render_blocks(message["content"]))
 
 # Chat input
 if prompt := st.chat_input("Ask me about news or request actions..."):
-    # Add user message to history
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    
+    add_message("user", prompt)
+
     # Display user message
     with st.chat_message("user"):
         st.markdown(prompt)
-    
-    # Display assistant response
+
+    # Display assistant response as its steps finish
     with st.chat_message("assistant"):
-        with st.spinner("Processing..."):
-            try:
-                response = requests.post(
-                    f"{API_BASE_URL}/chat/",
-                    json={
-                        "message": prompt,
-                        "session_id": st.session_state.session_id
-                    }
-                )
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    assistant_response = response_data.get("response", "Sorry, I couldn't process that.")
-                    
-                    # Handle PDF creation response
-                    if assistant_response.startswith("📄 PDF created successfully:"):
-                        pdf_path = assistant_response.split(": ")[1]
-                        st.session_state.last_pdf_path = pdf_path
-                        st.success(assistant_response)
-                        st.rerun()
-                    elif assistant_response.startswith("📧"):
-                        st.success(assistant_response)
-                    elif assistant_response.startswith("❌"):
-                        st.error(assistant_response)
-                    elif assistant_response.startswith("❗"):
-                        st.warning(assistant_response)
-                    else:
-                        # Format news results with better display
-                        if "1. " in assistant_response and ("http" in assistant_response or "www." in assistant_response):
-                            parts = assistant_response.split("\n")
-                            for part in parts:
-                                if part.strip().startswith("http") or part.strip().startswith("www."):
-                                    st.markdown(f"[🔗 {part}]({part})")
-                                else:
-                                    st.markdown(part)
-                        else:
-                            st.markdown(assistant_response)
-                else:
-                    error_msg = f"API Error: {response.status_code} - {response.text}"
-                    st.error(error_msg)
-                    assistant_response = error_msg
-                
-                # Add to message history
-                st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-                
-            except requests.exceptions.RequestException as e:
-                error_msg = f"Connection error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
\ No newline at end of file
+        placeholder = st.empty()
+        try:
+            with st.spinner("Processing..."):
+                assistant_response = stream_chat(prompt, placeholder)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            assistant_response = f"❌ Connection error: {str(e)}"
+        with placeholder.container():
+            show_blocks(render_blocks(assistant_response))
+
+    add_message("assistant", assistant_response)
+    if st.session_state.last_pdf and PDF_CREATED.search(assistant_response):
+        # Show the download section for the new report
+        st.rerun()